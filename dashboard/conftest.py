@@ -1,6 +1,13 @@
 import pytest
 
 from django.contrib.auth.models import Permission, User
+from django.core.cache import cache
+
+
+@pytest.fixture(autouse=True)
+def clear_cache():
+    # cached pages would otherwise outlive the data of the test that rendered them
+    cache.clear()
 
 
 @pytest.fixture
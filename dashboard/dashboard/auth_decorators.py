@@ -2,6 +2,7 @@
 Custom authentication decorators and mixins that conditionally require login
 based on OIDC configuration.
 """
+from asgiref.sync import iscoroutinefunction
 from django.conf import settings
 from django.contrib.auth.mixins import LoginRequiredMixin
 from django.contrib.auth.decorators import login_required
@@ -32,6 +33,14 @@ def conditional_login_required(view_func):
     Decorator that requires login only when OIDC is configured.
     When OIDC is not configured, allows anonymous access.
     """
+    if iscoroutinefunction(view_func):
+        @wraps(view_func)
+        async def async_wrapper(request, *args, **kwargs):
+            if settings.FORCE_LOGIN:
+                return await login_required(view_func)(request, *args, **kwargs)
+            return await view_func(request, *args, **kwargs)
+        return async_wrapper
+
     @wraps(view_func)
     def wrapper(request, *args, **kwargs):
         if settings.FORCE_LOGIN:
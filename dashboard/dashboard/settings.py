@@ -171,6 +171,33 @@ DATABASES = {
 }
 
 
+# Cache
+# https://docs.djangoproject.com/en/4.2/topics/cache/
+
+# Set DJANGO_REDIS_URL to try out a shared cache, as used in production.
+if os.environ.get("DJANGO_REDIS_URL"):
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.redis.RedisCache",
+            "LOCATION": os.environ["DJANGO_REDIS_URL"],
+        }
+    }
+else:
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+            # room for a row of every project, and their versions, which culling would
+            # otherwise evict along with the rows
+            "OPTIONS": {"MAX_ENTRIES": 10000},
+        }
+    }
+
+
+# Live updates of the project list go through Redis when it's configured, so that they reach
+# the pages served by every process; otherwise they only reach those of the same process.
+LIVE_UPDATES_REDIS_URL = os.environ.get("DJANGO_REDIS_URL")
+
+
 # Password validation
 # https://docs.djangoproject.com/en/4.2/ref/settings/#auth-password-validators
 
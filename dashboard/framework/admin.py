@@ -1,5 +1,6 @@
 from django.contrib import admin
 from django.db import models
+from django.template.response import TemplateResponse
 
 from tinymce.widgets import TinyMCE
 
@@ -41,6 +42,41 @@ class ObjectiveAdmin(admin.ModelAdmin):
 class WorkCycleAdmin(admin.ModelAdmin):
     list_display = ["name", "timestamp", "is_current"]
     list_editable = ["timestamp", "is_current"]
+    actions = ["apply_current_qis"]
+
+    @admin.action(
+        description="Apply current QI values to selected cycles",
+        permissions=["change"],
+    )
+    def apply_current_qis(self, request, queryset):
+        from projects.levels import apply_quality_indicators  # avoids circular import
+        from projects.models import QI
+
+        if request.POST.get("post"):
+            updated = apply_quality_indicators(list(queryset.values_list("id", flat=True)))
+            self.message_user(request, f"Copied current QI values to {updated} QIs.")
+            return None
+
+        # show what would change before applying anything
+        qis = (
+            QI.objects.filter(workcycle__in=queryset)
+            .select_related("project", "workcycle")
+            .order_by("workcycle__timestamp", "project__name")
+        )
+        changes = [qi for qi in qis if qi.value != qi.project.current_qi]
+        return TemplateResponse(
+            request,
+            "admin/framework/workcycle/apply_qis_confirmation.html",
+            {
+                **self.admin_site.each_context(request),
+                "title": "Apply current QI values",
+                "opts": self.model._meta,
+                "queryset": queryset,
+                "changes": changes,
+                "unchanged_count": len(qis) - len(changes),
+                "action_checkbox_name": admin.helpers.ACTION_CHECKBOX_NAME,
+            },
+        )
 
 
 admin.site.register(Level)
@@ -1,4 +1,44 @@
-from django.db import models
+from django.db import models, transaction
+from django.db.models import DEFERRED
+
+
+class TracksLoadedValues:
+    # remembers the values an instance was loaded with, so that save() can tell which fields
+    # have changed
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_values = dict(zip(field_names, values))
+        return instance
+
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        self._loaded_values = {
+            field.attname: self.__dict__[field.attname]
+            for field in self._meta.concrete_fields
+            if field.attname in self.__dict__
+        }
+
+    def loaded_value(self, attname):
+        """Return the value ``attname`` was loaded with, or None for a new instance."""
+        if self._state.adding:
+            return None
+        value = getattr(self, "_loaded_values", {}).get(attname, DEFERRED)
+        # without a loaded value, fall back to the database
+        if value is DEFERRED:
+            value = (
+                type(self)
+                .objects.filter(pk=self.pk)
+                .values_list(attname, flat=True)
+                .first()
+            )
+        return value
+
+    def has_changed(self, attname):
+        return not self._state.adding and self.loaded_value(attname) != getattr(
+            self, attname
+        )
 
 
 class AgreementStatus(models.Model):
@@ -22,31 +62,55 @@ class ProjectStatus(models.Model):
         verbose_name_plural = "Project review statuses"
 
 
-class Level(models.Model):
+class Level(TracksLoadedValues, models.Model):
     name = models.CharField(max_length=200, unique=True)
     value = models.SmallIntegerField()
 
     def __str__(self):
         return self.name
 
+    def save(self, *args, **kwargs):
+        from projects.dependencies import level_value_changed  # avoids circular import
+        from projects.summary import refresh_summaries
+
+        with transaction.atomic():
+            value_changed = self.has_changed("value")
+            renamed = self.has_changed("name")
+            super().save(*args, **kwargs)
+            if value_changed:
+                level_value_changed(self.pk)
+            if renamed:
+                # project summaries show levels by name
+                refresh_summaries()
+
     class Meta:
         ordering = ["value"]
         verbose_name = "Maturity level"
 
 
-class Reason(models.Model):
+class Reason(TracksLoadedValues, models.Model):
     name = models.CharField(max_length=200, unique=True)
     value = models.SmallIntegerField()
 
     def __str__(self):
         return self.name
 
+    def save(self, *args, **kwargs):
+        from projects.summary import refresh_summaries  # avoids circular import
+
+        with transaction.atomic():
+            renamed = self.has_changed("name")
+            super().save(*args, **kwargs)
+            if renamed:
+                # project summaries show reasons by name
+                refresh_summaries()
+
     class Meta:
         verbose_name = "Objective unstarted reason"
         ordering = ["value"]
 
 
-class WorkCycle(models.Model):
+class WorkCycle(TracksLoadedValues, models.Model):
     name = models.CharField(max_length=200, unique=True)
     timestamp = models.DateField("Ends")
     is_current = models.BooleanField("Is the current cycle", default=False)
@@ -56,34 +120,22 @@ class WorkCycle(models.Model):
 
     def save(self, *args, **kwargs):
 
-        from projects.models import (
-            ProjectObjective,
-            Commitment,
-            Project,
-            QI,
-        )  # avoids circular import
+        from projects.matrix import propagate_work_cycle  # avoids circular import
+        from projects.summary import refresh_summaries
 
-        super().save(*args, **kwargs)
+        adding = self._state.adding
 
-        # get all ProjectObjectives
-        projectobjectives = ProjectObjective.objects.all()
-
-        for level in Level.objects.all():
-            # get all projectobjectives with an ObjectiveCondition.level that matches
-            for project_objective in projectobjectives.filter(
-                objective__condition__level=level
-            ):
-                # make sure there is a corresponding Commitment
-                l = Commitment.objects.get_or_create(
-                    work_cycle=self,
-                    project=project_objective.project,
-                    objective=project_objective.objective,
-                    level=level,
-                )
-
-        # make sure there's a QI object for this WorkCycle for each Project
-        for project in Project.objects.all():
-            QI.objects.get_or_create(workcycle=self, project=project)
+        with transaction.atomic():
+            moved = self.has_changed("timestamp")
+            super().save(*args, **kwargs)
+
+            # a new WorkCycle needs a QI object for every Project; edits (such as
+            # toggling is_current) don't change the matrix
+            if adding:
+                propagate_work_cycle(self.pk)
+            elif moved:
+                # project summaries keep QI history in cycle order
+                refresh_summaries()
 
     @classmethod
     def name_of_current(cls):
@@ -106,7 +158,7 @@ class ObjectiveGroup(models.Model):
         ordering = ["id"]
 
 
-class Objective(models.Model):
+class Objective(TracksLoadedValues, models.Model):
     # a dimension in which quality can be measured
 
     name = models.CharField(max_length=100, unique=True)
@@ -122,35 +174,28 @@ class Objective(models.Model):
     def save(self, *args, **kwargs):
         # when a new Objective is added propagate it to all existing Projects
 
-        from projects.models import (
-            ProjectObjective,
-            Project,
-            Commitment,
-        )  # avoids circular import
-
-        super().save(*args, **kwargs)
-
-        # go over the Projects (but not any already with a relation to this objective, because that's unnecessary)
-        for project in Project.objects.exclude(objectives=self):
-            ProjectObjective(project=project, objective=self).save()
-
-        levels = self.condition_set.all()
+        from projects.dependencies import objective_weight_changed  # avoids circular import
+        from projects.matrix import propagate_objectives
+        from projects.summary import refresh_summaries
 
-        for level in Level.objects.all():
-            for project in Project.objects.all():
-                for work_cycle in WorkCycle.objects.all():
-                    l = Commitment.objects.get_or_create(
-                        work_cycle=work_cycle,
-                        project=project,
-                        objective=self,
-                        level=level,
-                    )
+        with transaction.atomic():
+            weight_changed = self.has_changed("weight")
+            # project summaries list objectives by name, in group and name order
+            reordered = self._state.adding or any(
+                map(self.has_changed, ["name", "group_id"])
+            )
+            super().save(*args, **kwargs)
+            propagate_objectives([self.pk])
+            if weight_changed:
+                objective_weight_changed(self.pk)
+            if reordered:
+                refresh_summaries()
 
     class Meta:
         ordering = ["group", "name"]
 
 
-class Condition(models.Model):
+class Condition(TracksLoadedValues, models.Model):
 
     # e.g. "All new content is created according to Diátaxis principles"
     name = models.TextField(max_length=400)
@@ -163,29 +208,12 @@ class Condition(models.Model):
     def save(self, *args, **kwargs):
         # when a new Condition is added propagate it to all existing ProjectObjectives
 
-        from projects.models import (
-            ProjectObjective,
-            ProjectObjectiveCondition,
-            Commitment
-        )  # avoids circular import
-
-        super().save(*args, **kwargs)
-
-        projectobjectives = ProjectObjective.objects.filter(objective=self.objective)
+        from projects.dependencies import condition_changed  # avoids circular import
 
-        for projectobjective in projectobjectives:
-            ProjectObjectiveCondition.objects.get_or_create(
-                project=projectobjective.project,
-                objective=projectobjective.objective,
-                condition=self,
-            )
-            for work_cycle in WorkCycle.objects.all():
-                Commitment.objects.get_or_create(
-                    work_cycle=work_cycle,
-                    project=projectobjective.project,
-                    objective=projectobjective.objective,
-                    level=self.level,
-            )
+        with transaction.atomic():
+            old_objective_id = self.loaded_value("objective_id")
+            super().save(*args, **kwargs)
+            condition_changed(self, old_objective_id)
 
     class Meta:
         ordering = ["objective__name", "level__value"]
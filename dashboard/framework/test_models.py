@@ -2,13 +2,17 @@ import datetime
 from pytest_django.asserts import assertQuerySetEqual
 
 import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
 
 from framework.models import WorkCycle, ObjectiveGroup, Objective, Condition, Level
+from projects.detail import ProjectDetail
 from projects.models import (
     Project,
     ProjectObjective,
     ProjectObjectiveCondition,
     Commitment,
+    QI,
 )
 
 
@@ -111,74 +115,205 @@ def test_new_project_acquires_projectiveconditions(
     assert project.projectobjectivecondition_set.all()[0].objective == objective
 
 
+def commitment_cells(project, objective):
+    # the objective's cells on the project's page
+    return [
+        (commitment.level, commitment.work_cycle, commitment.committed)
+        for group in ProjectDetail.load(project.id).groups
+        for section in group.objectives
+        if section.projectobjective.objective_id == objective.id
+        for level_section in section.levels
+        for commitment in level_section.commitments
+    ]
+
+
 @pytest.mark.django_db
-def test_new_project_acquires_commitments(
+def test_new_project_has_uncommitted_commitments(
     objective, objective_group, condition, work_cycle
 ):
+    # Only commitments that have been made are stored, but the project still has a cell for
+    # each cycle at each level.
 
     project = Project.objects.create(
         name="test_project", owner="test_owner", driver="test_driver"
     )
-    assert project.pk == 1
-    assert project.commitment_set.count() == 1
-    assert project.commitment_set.all()[0].objective == objective
+    assert not project.commitment_set.exists()
+    assert commitment_cells(project, objective) == [
+        (condition.level, work_cycle, False)
+    ]
 
 
 @pytest.mark.django_db
-def test_workcycle_is_propagated_to_commitments(
-    work_cycle, condition, project_objective
+def test_commitment_cells_follow_workcycles_and_levels(
+    project, objective, condition, work_cycle
+):
+    Commitment.objects.create(
+        project=project, objective=objective, level=condition.level, work_cycle=work_cycle
+    )
+    work_cycle_2 = WorkCycle.objects.create(
+        name="test_work_cycle_2", timestamp=datetime.date.today()
+    )
+    new_level = Level.objects.create(name="test_level_2", value=2)
+    Condition.objects.create(
+        name="test_condition_2", objective=objective, level=new_level
+    )
+    # a level without conditions for the objective has no cells
+    Level.objects.create(name="test_level_3", value=3)
+
+    assert commitment_cells(project, objective) == [
+        (condition.level, work_cycle, True),
+        (condition.level, work_cycle_2, False),
+        (new_level, work_cycle, False),
+        (new_level, work_cycle_2, False),
+    ]
+    assert Commitment.objects.count() == 1
+
+
+@pytest.mark.django_db
+def test_objective_and_condition_save_query_count_is_independent_of_projects(
+    objective_group, level, work_cycle
 ):
+    # Saving an Objective or Condition should cost the same number of queries however many
+    # projects and cycles there are.
+
+    Project.objects.create(name="project_1")
+    with CaptureQueriesContext(connection) as few_objective:
+        objective = Objective.objects.create(
+            name="objective_1", group=objective_group, weight=1
+        )
+    with CaptureQueriesContext(connection) as few_condition:
+        Condition.objects.create(name="condition_1", objective=objective, level=level)
+
+    for i in range(2, 6):
+        Project.objects.create(name=f"project_{i}")
+        WorkCycle.objects.create(name=f"cycle_{i}", timestamp=datetime.date.today())
+    with CaptureQueriesContext(connection) as many_objective:
+        objective = Objective.objects.create(
+            name="objective_2", group=objective_group, weight=1
+        )
+    with CaptureQueriesContext(connection) as many_condition:
+        Condition.objects.create(name="condition_2", objective=objective, level=level)
+
+    assert len(many_objective) == len(few_objective)
+    assert len(many_condition) == len(few_condition)
+    assert ProjectObjectiveCondition.objects.filter(objective=objective).count() == 5
+    assert not Commitment.objects.exists()
 
-    assert work_cycle.commitment_set.count() == 1
+
+@pytest.mark.django_db
+def test_new_workcycle_acquires_qis(project):
     work_cycle = WorkCycle.objects.create(
         name="test_work_cycle_2", timestamp=datetime.date.today()
     )
 
-    # there should be a new Commitment
-    assert work_cycle.commitment_set.count() == 1
-    assert Commitment.objects.count() == 2
-    assert work_cycle.commitment_set.filter(work_cycle=work_cycle).exists()
+    assert QI.objects.filter(workcycle=work_cycle, project=project).count() == 1
 
 
 @pytest.mark.django_db
-def test_new_objective_means_new_commitments(
-    project, project_objective, objective_group, condition, work_cycle
+def test_editing_workcycle_leaves_matrix_alone(
+    work_cycle, condition, project_objective
 ):
-    assert project.commitment_set.count() == 1
-    assert work_cycle.commitment_set.count() == 1
+    # Toggling is_current (for example, in the admin list view) shouldn't touch the matrix.
 
-    objective = Objective.objects.create(
-        name="test_objective_2", group=objective_group, weight=1
-    )
+    with CaptureQueriesContext(connection) as queries:
+        work_cycle.is_current = True
+        work_cycle.save()
 
-    assert project.commitment_set.count() == 2
-    assert work_cycle.commitment_set.count() == 2
+    assert not any(QI._meta.db_table in query["sql"] for query in queries)
+    assert QI.objects.count() == 1
 
 
 @pytest.mark.django_db
-def test_new_condition_with_new_level_backfills_commitment(
-    project, objective, condition, work_cycle
+def test_moving_condition_to_another_objective_updates_levels(
+    objective_group, level, condition, project_objective
 ):
-    # A new condition at a new level should create a matching commitment
-    # for existing rows.
-
-    assert (
-        Commitment.objects.filter(
-            project=project, objective=objective, work_cycle=work_cycle
-        ).count()
-        == 1
-    )
+    # The condition is the only one of its objective, and done, so the objective has achieved
+    # the level. Moving it to an objective with an undone condition at the same level moves
+    # the achievement with it.
+
+    ProjectObjectiveCondition.objects.filter(condition=condition).update(status="DO")
+    Condition.objects.get(pk=condition.pk).save()  # recount from the updated statuses
+    other = Objective.objects.create(name="other", group=objective_group, weight=1)
+    Condition.objects.create(name="other_condition", objective=other, level=level)
+    project = project_objective.project
+    assert ProjectObjective.objects.get(pk=project_objective.pk).level_achieved == level
+
+    condition = Condition.objects.get(pk=condition.pk)
+    condition.objective = other
+    condition.save()
+
+    assert ProjectObjectiveCondition.objects.get(condition=condition).objective == other
+    for projectobjective in ProjectObjective.objects.filter(project=project):
+        assert projectobjective.level_achieved_id == getattr(
+            projectobjective.achieved_level, "id", None
+        )
+    assert ProjectObjective.objects.get(pk=project_objective.pk).level_achieved is None
+    project.refresh_from_db()
+    assert project.current_qi == project.quality_indicator == 0
 
-    new_level = Level.objects.create(name="test_level_2", value=2)
-    Condition.objects.create(
-        name="test_condition_2", objective=objective, level=new_level
-    )
 
-    # Expected behaviour: creating a new condition/level backfills
-    # commitments.
-    assert Commitment.objects.filter(
-        project=project,
-        objective=objective,
-        work_cycle=work_cycle,
-        level=new_level,
-    ).exists()
+@pytest.mark.django_db
+def test_changing_level_value_reorders_levels(objective, project_objective):
+    # level_a comes first and is done; level_b has an undone condition. Swapping their
+    # values puts the undone level first, so nothing is achieved any more.
+
+    level_a = Level.objects.create(name="level_a", value=1)
+    level_b = Level.objects.create(name="level_b", value=2)
+    done = Condition.objects.create(name="done", objective=objective, level=level_a)
+    Condition.objects.create(name="undone", objective=objective, level=level_b)
+    poc = ProjectObjectiveCondition.objects.get(condition=done)
+    poc.status = "DO"
+    poc.save()
+    project = project_objective.project
+    project.refresh_from_db()
+    assert project.current_qi == 1
+
+    level_a = Level.objects.get(pk=level_a.pk)
+    level_a.value = 3
+    level_a.save()
+
+    project_objective = ProjectObjective.objects.get(pk=project_objective.pk)
+    assert project_objective.level_achieved is project_objective.achieved_level is None
+    project.refresh_from_db()
+    assert project.current_qi == project.quality_indicator == 0
+
+
+@pytest.mark.django_db
+def test_framework_edits_only_touch_affected_projects(
+    objective_group, level, condition, project_objective
+):
+    ProjectObjectiveCondition.objects.filter(condition=condition).update(status="DO")
+    Condition.objects.get(pk=condition.pk).save()  # recount from the updated statuses
+    bystander = Project.objects.create(name="bystander")
+    ProjectObjectiveCondition.objects.filter(project=bystander).update(status="")
+    Project.objects.filter(pk=bystander.pk).update(current_qi=99)
+
+    objective = Objective.objects.get(pk=condition.objective_id)
+    objective.weight = 4
+    objective.save()
+    level = Level.objects.get(pk=level.pk)
+    level.value = 2
+    level.save()
+
+    project = project_objective.project
+    project.refresh_from_db()
+    assert project.current_qi == project.quality_indicator == 8
+    # the bystander has achieved nothing, so its (deliberately wrong) value is left alone
+    bystander.refresh_from_db()
+    assert bystander.current_qi == 99
+
+
+@pytest.mark.django_db
+def test_editing_names_leaves_levels_alone(level, objective):
+    # Renaming a level or an objective can't change any level or quality indicator.
+
+    with CaptureQueriesContext(connection) as queries:
+        level.name = "renamed"
+        level.save()
+        objective = Objective.objects.get(pk=objective.pk)
+        objective.description = "described"
+        objective.save()
+
+    assert not any(
+        Project._meta.db_table + '" SET' in query["sql"] for query in queries
+    )
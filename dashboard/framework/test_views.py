@@ -187,3 +187,35 @@ def test_admin_apply_qis_with_no_projects(
         "admin:framework_workcycle_change", args=[work_cycle.id]
     )
     assert response.url == expected_redirect
+
+
+@pytest.mark.django_db
+def test_apply_current_qis_action_previews_and_applies(
+    admin_client, work_cycle, project, objective, level
+):
+    """Test that the admin action previews QI changes for several cycles, then applies them."""
+
+    second_work_cycle = WorkCycle.objects.create(
+        name="test_work_cycle_2", timestamp=datetime.date.today()
+    )
+    po = ProjectObjective.objects.get(project=project, objective=objective)
+    po.achieved_level = level
+    po.save()
+    project.refresh_from_db()
+    assert project.current_qi == 15
+
+    url = reverse("admin:framework_workcycle_changelist")
+    data = {
+        "action": "apply_current_qis",
+        "_selected_action": [work_cycle.id, second_work_cycle.id],
+    }
+
+    # the first request only shows a preview
+    response = admin_client.post(url, data)
+    assert response.status_code == 200
+    assert len(response.context["changes"]) == 2
+    assert QI.objects.filter(project=project, value=0).count() == 2
+
+    response = admin_client.post(url, {**data, "post": "yes"})
+    assert response.status_code == 302
+    assert QI.objects.filter(project=project, value=15).count() == 2
@@ -5,15 +5,12 @@ from django.contrib import messages
 from django.contrib.auth.decorators import permission_required
 from django.http import HttpResponse, HttpResponseRedirect
 
-from projects.models import Project, QI
+from projects.levels import apply_quality_indicators
 
 
 @permission_required("framework.change_workcycle")
 def admin_apply_qis(request, workcycle_id):
-    qis = QI.objects.filter(workcycle_id=workcycle_id).select_related("project")
-    for qi in qis:
-        qi.value = qi.project.quality_indicator
-    QI.objects.bulk_update(qis, ["value"])
+    apply_quality_indicators([workcycle_id])
     messages.info(request, 'Copied current QI values.')
     return HttpResponseRedirect(
        reverse('admin:framework_workcycle_change', args=[workcycle_id])
@@ -1,5 +1,6 @@
 from django.contrib import admin
 from django import forms
+from django.db import transaction
 
 from .models import (
     ProjectGroup,
@@ -12,6 +13,38 @@ from .models import (
 
 from framework.models import WorkCycle
 
+from .caching import bump_versions
+from .levels import (
+    rebuild_level_counters,
+    recalculate_levels,
+    refresh_quality_indicators,
+)
+from .summary import refresh_summaries
+
+
+class MaintainOnDeleteMixin:
+    # the rows of a project are deleted without signals, so that they can be deleted in bulk
+    # along with it; deleting them here brings what's derived from them up to date, and
+    # invalidates the pages that show them
+
+    def delete_model(self, request, obj):
+        with transaction.atomic():
+            super().delete_model(request, obj)
+            self.rows_deleted([obj])
+
+    def delete_queryset(self, request, queryset):
+        with transaction.atomic():
+            rows = list(queryset)
+            super().delete_queryset(request, queryset)
+            self.rows_deleted(rows)
+
+    def rows_deleted(self, rows):
+        # the projects' QIs and summaries may have included the deleted rows
+        project_ids = {row.project_id for row in rows}
+        refresh_quality_indicators(project_ids)
+        refresh_summaries(project_ids)
+        bump_versions(project_ids)
+
 
 class ProjectObjectiveConditionInline(admin.TabularInline):
     model = ProjectObjectiveCondition
@@ -51,7 +84,7 @@ class CommitmentInline(admin.TabularInline):
 
 
 @admin.register(ProjectObjective)
-class ProjectObjectiveAdmin(admin.ModelAdmin):
+class ProjectObjectiveAdmin(MaintainOnDeleteMixin, admin.ModelAdmin):
     readonly_fields = ["project", "objective", "status"]
     list_filter = ["project", "objective", "unstarted_reason"]
 
@@ -107,14 +140,22 @@ class ProjectAdmin(admin.ModelAdmin):
 
 
 @admin.register(Commitment)
-class CommitmentAdmin(admin.ModelAdmin):
-    list_filter = ["work_cycle", "project", "objective", "level", "committed"]
+class CommitmentAdmin(MaintainOnDeleteMixin, admin.ModelAdmin):
+    list_filter = ["work_cycle", "project", "objective", "level", "committed", "met"]
 
 
 @admin.register(ProjectObjectiveCondition)
-class ProjectObjectiveConditionAdmin(admin.ModelAdmin):
+class ProjectObjectiveConditionAdmin(MaintainOnDeleteMixin, admin.ModelAdmin):
     list_filter = ["project", "objective", "condition", "status"]
 
+    def rows_deleted(self, rows):
+        # the deleted conditions no longer count towards the levels of their objectives
+        project_ids = {row.project_id for row in rows}
+        objective_ids = {row.objective_id for row in rows}
+        rebuild_level_counters(project_ids=project_ids, objective_ids=objective_ids)
+        recalculate_levels(project_ids=project_ids, objective_ids=objective_ids)
+        super().rows_deleted(rows)
+
 
 class FilterFieldOrderByName(admin.filters.RelatedFieldListFilter):
     def field_choices(self, field, request, model_admin):
@@ -123,7 +164,7 @@ class FilterFieldOrderByName(admin.filters.RelatedFieldListFilter):
 
 
 @admin.register(QI)
-class QIAdmin(admin.ModelAdmin):
+class QIAdmin(MaintainOnDeleteMixin, admin.ModelAdmin):
     list_filter = [("project", FilterFieldOrderByName)]
     readonly_fields = ["project", "workcycle"]
 
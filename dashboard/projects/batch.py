@@ -0,0 +1,112 @@
+"""
+Applying a batch of changes to a project in one go.
+
+Reviewers often tick many conditions in a row. Saving each of them recalculates the level of
+its objective, and refreshes the project's stored quality indicator, commitments and summary.
+apply_changes() stores all of the new statuses first, then adjusts each undone counter
+concerned once and recalculates each ProjectObjective concerned once. Reasons and commitments
+can be changed in the same batch, and everything happens in a single transaction.
+"""
+
+from dataclasses import dataclass, field
+
+from django.db import transaction
+
+from framework.models import Reason
+
+from .caching import bump_versions
+from .commitments import toggle_commitment
+from .levels import record_status_changes
+from .models import Commitment, ProjectObjective, ProjectObjectiveCondition
+from .summary import refresh_summaries
+
+
+@dataclass
+class Changes:
+    # the ProjectObjectiveConditions whose status was set
+    conditions: list = field(default_factory=list)
+    # an unsaved Commitment for each commitment toggled, in its new state
+    commitments: list = field(default_factory=list)
+    # the objectives whose status may have changed
+    objective_ids: set = field(default_factory=set)
+
+
+def apply_changes(project_id, conditions=None, commitments=(), reasons=None):
+    """Apply a batch of changes to the project ``project_id``, in a single transaction.
+
+    ``conditions`` maps ProjectObjectiveCondition ids to their new statuses, ``commitments``
+    lists the (objective_id, level_id, work_cycle_id) of commitments to toggle, and ``reasons``
+    maps ProjectObjective ids to the ids of their new unstarted reasons, or None.
+
+    Raises ValueError for an unknown status or reason, or ObjectDoesNotExist for anything that
+    isn't part of the project, in which case nothing is changed. Returns the Changes made.
+    """
+    conditions = conditions or {}
+    reasons = reasons or {}
+    for status in conditions.values():
+        if status not in ProjectObjectiveCondition.STATUS_CHOICES:
+            raise ValueError(f"Unknown status {status!r}.")
+    reason_ids = {reason_id for reason_id in reasons.values() if reason_id is not None}
+    if Reason.objects.filter(id__in=reason_ids).count() != len(reason_ids):
+        raise ValueError("Unknown reason.")
+
+    changes = Changes()
+    with transaction.atomic():
+        changes.conditions = list(
+            ProjectObjectiveCondition.objects.select_for_update(of=("self",))
+            .filter(project_id=project_id, id__in=conditions)
+            .select_related("condition")
+        )
+        if len(changes.conditions) != len(conditions):
+            raise ProjectObjectiveCondition.DoesNotExist(
+                "No such condition in the project."
+            )
+        old_statuses = {}
+        for condition in changes.conditions:
+            old_statuses[condition.id] = condition.status
+            condition.status = conditions[condition.id]
+            changes.objective_ids.add(condition.objective_id)
+        if changes.conditions:
+            ProjectObjectiveCondition.objects.bulk_update(changes.conditions, ["status"])
+            # the counters are adjusted under the locks on the conditions, like a single
+            # toggle's, so that toggles made at the same time aren't lost
+            record_status_changes(
+                (condition, old_statuses[condition.id])
+                for condition in changes.conditions
+            )
+            # bulk updates send no signals
+            bump_versions([project_id])
+
+        if reasons:
+            projectobjectives = dict(
+                ProjectObjective.objects.filter(
+                    project_id=project_id, id__in=reasons
+                ).values_list("id", "objective_id")
+            )
+            if len(projectobjectives) != len(reasons):
+                raise ProjectObjective.DoesNotExist("No such objective in the project.")
+            by_reason = {}
+            for projectobjective_id, reason_id in reasons.items():
+                by_reason.setdefault(reason_id, []).append(projectobjective_id)
+            for reason_id, projectobjective_ids in by_reason.items():
+                ProjectObjective.objects.filter(id__in=projectobjective_ids).update(
+                    unstarted_reason_id=reason_id
+                )
+            changes.objective_ids.update(projectobjectives.values())
+            refresh_summaries([project_id])
+
+        # toggled last, so that whether they are met reflects the levels recalculated above
+        for objective_id, level_id, work_cycle_id in commitments:
+            committed = toggle_commitment(project_id, objective_id, level_id, work_cycle_id)
+            if committed is None:
+                raise Commitment.DoesNotExist("No such commitment.")
+            changes.commitments.append(
+                Commitment(
+                    project_id=project_id,
+                    objective_id=objective_id,
+                    level_id=level_id,
+                    work_cycle_id=work_cycle_id,
+                    committed=committed,
+                )
+            )
+    return changes
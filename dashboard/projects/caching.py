@@ -0,0 +1,187 @@
+"""
+Caching of the rendered project list, and conditional responses.
+
+The list shows data from many tables, so rather than tracking which cached pages each change
+affects, every cached page is keyed on a single data version. A write to anything the list
+displays bumps the version, which makes every page cached under the old one unreachable; they
+then expire from the cache on their own.
+
+Within a page, each project's row is cached too, keyed on a version of its own. A change to a
+project bumps its version, while a change that affects every project, such as renaming an
+objective, bumps the framework version that all the rows share. Either also bumps the data
+version.
+
+A version is the time of the last change, in nanoseconds, so the same versions also provide
+the ETags of the pages and partials, which can then be answered with 304 Not Modified without
+being rendered.
+
+The versions live in the cache itself, so that with a shared backend such as Redis a change
+made by one process invalidates the pages and rows cached by all of them.
+"""
+import hashlib
+import time
+from datetime import date
+from functools import wraps
+
+from django.core.cache import cache
+from django.db import transaction
+from django.middleware.csrf import get_token
+from django.utils.cache import get_conditional_response, quote_etag
+
+from .changes import record_changes
+from .models import ProjectObjective
+
+DATA_VERSION_KEY = "projects:data-version"
+FRAMEWORK_VERSION_KEY = "projects:framework-version"
+
+# a cached page or row is only ever replaced by a change, so this just bounds how long unused
+# ones are kept
+PAGE_TIMEOUT = 24 * 3600
+
+
+def project_version_key(project_id):
+    return f"projects:project-version:{project_id}"
+
+
+def versions(keys):
+    """Return the current version stored under each of ``keys``, as a dict."""
+    found = cache.get_many(keys)
+    missing = [key for key in keys if key not in found]
+    if missing:
+        # a lost version is replaced with the current time, which no earlier version can match
+        now = time.time_ns()
+        for key in missing:
+            cache.add(key, now, timeout=None)
+        # another process may have added a version first, and a dummy cache keeps none
+        found.update({key: now for key in missing} | cache.get_many(missing))
+    return found
+
+
+def data_version():
+    """Return the current data version."""
+    return versions([DATA_VERSION_KEY])[DATA_VERSION_KEY]
+
+
+def _bump(keys):
+    cache.set_many(dict.fromkeys(keys, time.time_ns()), timeout=None)
+
+
+def bump_versions(project_ids=None):
+    """Invalidate every cached page, and the cached rows of the given projects (default: all).
+
+    The versions are bumped straight away, and again when the current transaction commits: a
+    page rendered in between, from data read before the commit, is cached under a version that
+    is then already out of date.
+
+    The change is also recorded, for the pages that are kept open to catch up with it.
+    """
+    if project_ids is None:
+        keys = [DATA_VERSION_KEY, FRAMEWORK_VERSION_KEY]
+    else:
+        project_ids = list(project_ids)
+        keys = [DATA_VERSION_KEY, *map(project_version_key, project_ids)]
+    _bump(keys)
+    transaction.on_commit(lambda: _bump(keys))
+    record_changes(project_ids)
+
+
+def permission_fingerprint(user):
+    """Return a short string that differs between users who may see different pages."""
+    if not user.is_authenticated:
+        return "anonymous"
+    permissions = sorted(user.get_all_permissions())
+    details = [str(user.is_staff), str(user.is_superuser), *permissions]
+    return hashlib.sha1("\n".join(details).encode()).hexdigest()
+
+
+def page_key(name, user):
+    """Return the cache key for page ``name`` as seen by ``user``, at the current version.
+
+    The date is part of the key too, since review freshness and past work cycles depend on it.
+    """
+    return ":".join(
+        [
+            "projects:page",
+            name,
+            str(data_version()),
+            date.today().isoformat(),
+            permission_fingerprint(user),
+        ]
+    )
+
+
+def row_keys(project_ids):
+    """Return the cache key for the list row of each of the given projects, as a dict.
+
+    The versions are fetched from the cache in one go, however many projects there are.
+    """
+    project_ids = list(project_ids)
+    current = versions([FRAMEWORK_VERSION_KEY, *map(project_version_key, project_ids)])
+    prefix = f"projects:row:{current[FRAMEWORK_VERSION_KEY]}:{date.today().isoformat()}"
+    return {
+        project_id: f"{prefix}:{project_id}:{current[project_version_key(project_id)]}"
+        for project_id in project_ids
+    }
+
+
+def projectobjective_project_id(projectobjective_id):
+    """Return the id of the project of a ProjectObjective, which never changes."""
+    key = f"projects:projectobjective-project:{projectobjective_id}"
+    project_id = cache.get(key)
+    if project_id is None:
+        project_id = (
+            ProjectObjective.objects.filter(id=projectobjective_id)
+            .values_list("project_id", flat=True)
+            .first()
+        )
+        if project_id is not None:
+            cache.set(key, project_id, PAGE_TIMEOUT)
+    return project_id
+
+
+def project_keys(project_id):
+    """The version keys of the pages and partials that show a single project."""
+    return [FRAMEWORK_VERSION_KEY, project_version_key(project_id)]
+
+
+def projectobjective_keys(projectobjective_id):
+    """The version keys of the partials that show a single ProjectObjective."""
+    return project_keys(projectobjective_project_id(projectobjective_id))
+
+
+def conditional(version_keys):
+    """Decorate a GET view to send an ETag header, and to answer with 304 Not Modified when the
+    client's copy is still current.
+
+    ``version_keys`` is called with the view's URL arguments, and returns the keys of the
+    versions that the response depends on. The check costs a single cache lookup, so an
+    unchanged resource is neither queried for nor rendered.
+    """
+
+    def decorator(view):
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            current = versions(version_keys(*args, **kwargs))
+            # pages carry a CSRF token, which changes when the user logs in, so the ETag
+            # covers the secret behind it, created here if there's none yet
+            get_token(request)
+            details = [
+                *map(str, current.values()),
+                date.today().isoformat(),
+                permission_fingerprint(request.user),
+                request.META["CSRF_COOKIE"],
+            ]
+            etag = quote_etag(hashlib.sha1("\n".join(details).encode()).hexdigest())
+
+            # no Last-Modified, which has a resolution of a second and can't cover the
+            # permissions and the CSRF secret
+            response = get_conditional_response(request, etag=etag)
+            if response is None:
+                response = view(request, *args, **kwargs)
+                if request.method in ("GET", "HEAD") and response.status_code == 200:
+                    response.headers.setdefault("ETag", etag)
+            return response
+
+        return wrapper
+
+    return decorator
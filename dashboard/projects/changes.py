@@ -0,0 +1,97 @@
+"""
+Versions of the project data, for pages that are kept open to catch up with what changed.
+
+Every change to the data already bumps the cache versions of the projects concerned, or of
+every project, through caching.bump_versions(), which calls record_changes(). The projects are
+collected until the transaction commits, and then recorded as ProjectChange rows in a single
+short transaction. A change's version is its row's id; only the latest change of each project is
+kept.
+
+A page records the version it was rendered at, and then asks for the projects changed since, or
+is sent them by projects.live as they're recorded. Ids are taken when the rows are inserted, so
+if two recordings ran at once, the one with the lower version could commit after the other, and
+a page that had caught up with the higher version would miss it for good. Recordings are
+therefore serialised, so that versions become visible in order: SQLite only lets one transaction
+write at a time anyway, and on PostgreSQL the table is locked against other writers, though not
+readers, until the recording commits. The recording transaction is kept to a delete and an
+insert so that the others wait as little as they can.
+"""
+
+import threading
+
+from django.db import connection, transaction
+from django.db.models import Max, Q
+
+from .live import publish
+from .models import ProjectChange
+
+_pending = threading.local()
+
+# a project id standing for every project, when the framework changes
+EVERY_PROJECT = None
+
+
+def record_changes(project_ids=None):
+    """Record a change to the given projects (default: all), when the transaction commits."""
+    connection = transaction.get_connection()
+    # Django replaces its list of commit callbacks whenever the transaction commits or is
+    # rolled back, or a savepoint is rolled back, so a new list means that the projects pending
+    # for the old one have been recorded, are recorded by callbacks that are still registered,
+    # or were rolled back and must not be
+    if (
+        not connection.in_atomic_block
+        or getattr(_pending, "callbacks", None) is not connection.run_on_commit
+    ):
+        _pending.callbacks = connection.run_on_commit
+        _pending.project_ids = set()
+    pending = _pending.project_ids
+    if project_ids is None:
+        pending.add(EVERY_PROJECT)
+    else:
+        pending.update(project_ids)
+    # the first of the callbacks to run records everything pending, and the others find
+    # nothing left to record
+    transaction.on_commit(lambda: _flush(pending))
+
+
+def _flush(pending):
+    if not pending:
+        return
+    project_ids = set(pending)
+    pending.clear()
+
+    # the earlier changes of the projects are replaced, rather than kept forever
+    replaced = Q(project_id__in=project_ids - {EVERY_PROJECT})
+    if EVERY_PROJECT in project_ids:
+        replaced |= Q(project_id__isnull=True)
+    with transaction.atomic():
+        if connection.vendor == "postgresql":
+            # held until the commit, so that the ids are handed out in the order in which
+            # they commit
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    f"LOCK TABLE {ProjectChange._meta.db_table} IN EXCLUSIVE MODE"
+                )
+        ProjectChange.objects.filter(replaced).delete()
+        ProjectChange.objects.bulk_create(
+            [ProjectChange(project_id=project_id) for project_id in project_ids]
+        )
+    # the open pages can now be sent what changed
+    publish(list(project_ids))
+
+
+def current_versions():
+    """Return the current change version, and the version of the last framework change."""
+    versions = ProjectChange.objects.aggregate(
+        version=Max("id"),
+        framework_version=Max("id", filter=Q(project_id__isnull=True)),
+    )
+    return versions["version"] or 0, versions["framework_version"] or 0
+
+
+def changed_since(version, project_ids=None):
+    """Return the ids of the projects (default: all) changed since ``version``."""
+    changes = ProjectChange.objects.filter(id__gt=version, project_id__isnull=False)
+    if project_ids is not None:
+        changes = changes.filter(project_id__in=project_ids)
+    return list(changes.values_list("project_id", flat=True).distinct())
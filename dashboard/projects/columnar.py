@@ -0,0 +1,149 @@
+"""
+The data behind the project list, encoded column-wise, for tools and clients that render it
+themselves.
+
+Rather than an object per project, with a nested object per cell, each attribute is a single
+array with a value per project, objective or cycle, in the order the list shows them. The
+statuses and QIs form one array per objective and per cycle. Repeated strings, such as the
+statuses and group names, are sent once in a dictionary and referred to by their index in it.
+
+Every cycle is included, with the date it ends; the list itself only shows the cycles that have
+ended.
+"""
+
+from framework.models import Objective, WorkCycle
+
+from .models import Project
+from .summary import refresh_missing_summaries
+
+
+class Dictionary:
+    """Assigns small integer codes to values, in order of first use. Code 0 stands for None."""
+
+    def __init__(self):
+        self.codes = {None: 0}
+
+    def encode(self, value):
+        return self.codes.setdefault(value, len(self.codes))
+
+    @property
+    def values(self):
+        return list(self.codes)
+
+
+def columns(rows, names):
+    """Transpose ``rows`` of values into a dict mapping each of ``names`` to a column."""
+    return dict(zip(names, map(list, zip(*rows)))) if rows else dict.fromkeys(names, [])
+
+
+def matrix():
+    """Return the data of the project list, column-wise, in a fixed number of queries."""
+    refresh_missing_summaries()
+    objective_rows = list(Objective.objects.values_list("id", "name", "group__name"))
+    cycle_rows = list(
+        WorkCycle.objects.values_list("id", "name", "timestamp", "is_current")
+    )
+    project_rows = list(
+        Project.objects.values_list(
+            "id",
+            "name",
+            "group__name",
+            "owner",
+            "driver",
+            "last_review",
+            "last_review_status__name",
+            "agreement_status__name",
+            "current_qi",
+            "summary__statuses",
+            "summary__quality_history",
+        )
+    )
+
+    dictionaries = {
+        name: Dictionary()
+        for name in [
+            "project_group",
+            "objective_group",
+            "review_status",
+            "agreement_status",
+            "status",
+        ]
+    }
+    encode = {name: dictionary.encode for name, dictionary in dictionaries.items()}
+
+    objectives = columns(
+        [
+            (objective_id, name, encode["objective_group"](group))
+            for objective_id, name, group in objective_rows
+        ],
+        ["id", "name", "group"],
+    )
+    cycles = columns(
+        [
+            (cycle_id, name, timestamp.isoformat(), is_current)
+            for cycle_id, name, timestamp, is_current in cycle_rows
+        ],
+        ["id", "name", "ends", "current"],
+    )
+
+    projects = []
+    # a column of status codes for each objective, and of QIs for each cycle
+    statuses = [[] for _ in objective_rows]
+    quality_history = [[] for _ in cycle_rows]
+    for (
+        project_id,
+        name,
+        group,
+        owner,
+        driver,
+        last_review,
+        review_status,
+        agreement_status,
+        current_qi,
+        project_statuses,
+        project_history,
+    ) in project_rows:
+        projects.append(
+            (
+                project_id,
+                name,
+                encode["project_group"](group),
+                owner,
+                driver,
+                last_review and last_review.isoformat(),
+                encode["review_status"](review_status),
+                encode["agreement_status"](agreement_status),
+                current_qi,
+            )
+        )
+        # the summary lists the statuses by objective name, and the QIs by cycle id
+        project_statuses = dict(project_statuses)
+        for column, (_, objective_name, _) in zip(statuses, objective_rows):
+            column.append(encode["status"](project_statuses.get(objective_name)))
+        project_history = dict(project_history)
+        for column, (cycle_id, *_) in zip(quality_history, cycle_rows):
+            column.append(project_history.get(cycle_id))
+
+    return {
+        "projects": columns(
+            projects,
+            [
+                "id",
+                "name",
+                "group",
+                "owner",
+                "driver",
+                "last_review",
+                "review_status",
+                "agreement_status",
+                "current_qi",
+            ],
+        ),
+        "objectives": objectives,
+        "cycles": cycles,
+        "statuses": statuses,
+        "quality_history": quality_history,
+        "dictionaries": {
+            name: dictionary.values for name, dictionary in dictionaries.items()
+        },
+    }
@@ -0,0 +1,66 @@
+"""
+Making and withdrawing commitments.
+
+Only commitments that have been made are stored, so a toggle either deletes the row or stores
+it. A toggle first locks the ProjectObjective the commitment belongs to, so that concurrent
+toggles of the project's commitments to the objective take turns: each sees the state the one
+before it left behind, and no click is lost. Toggles of other objectives and projects don't
+wait for each other.
+"""
+
+from django.db import transaction
+from django.db.models import Exists
+
+from framework.models import Level, WorkCycle
+
+from .caching import bump_versions
+from .models import Commitment, ProjectObjective
+
+
+def toggle_commitment(project_id, objective_id, level_id, work_cycle_id):
+    """Make the commitment if it hasn't been made, or withdraw it if it has.
+
+    Returns whether the commitment is now made, or None if there's no such commitment to make:
+    the project, objective, level or cycle doesn't exist, or the objective has no conditions at
+    the level.
+    """
+    key = dict(
+        project_id=project_id,
+        objective_id=objective_id,
+        level_id=level_id,
+        work_cycle_id=work_cycle_id,
+    )
+
+    with transaction.atomic():
+        achieved = list(
+            ProjectObjective.objects.select_for_update(of=("self",))
+            .filter(project_id=project_id, objective_id=objective_id)
+            .values_list("level_achieved__value", flat=True)
+        )
+        if not achieved:
+            return None
+
+        # a commitment that hasn't been made is normally not stored, but one left over from
+        # before, with committed False, is made like any other
+        deleted, _ = Commitment.objects.filter(**key, committed=True).delete()
+        if deleted:
+            committed = False
+        else:
+            # commitments can only be made at the levels that have conditions
+            value = (
+                Level.objects.filter(id=level_id, condition__objective_id=objective_id)
+                .filter(Exists(WorkCycle.objects.filter(id=work_cycle_id)))
+                .values_list("value", flat=True)
+                .first()
+            )
+            if value is None:
+                return None
+            # met if the level achieved is at least as high, like Commitment.save()
+            met = achieved[0] is not None and achieved[0] >= value
+            if not Commitment.objects.filter(**key).update(committed=True, met=met):
+                Commitment.objects.bulk_create([Commitment(**key, met=met)])
+            committed = True
+
+        # the bulk queries bypass the signals that usually do this
+        bump_versions([project_id])
+    return committed
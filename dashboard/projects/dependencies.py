@@ -0,0 +1,66 @@
+"""
+Recomputation after edits to the framework.
+
+Levels achieved, quality indicators and met commitments depend on the framework: the objective
+and level of each condition, the value of each level and the weight of each objective. The
+functions here work out which ProjectObjectives and Projects an edit affects and bring only
+those up to date, in bulk. Call them in the same transaction as the edit.
+"""
+
+from framework.models import Condition
+
+from .levels import (
+    rebuild_level_counters,
+    recalculate_levels,
+    refresh_commitments_met,
+    refresh_quality_indicators,
+)
+from .matrix import propagate_conditions
+from .models import ProjectObjective, ProjectObjectiveCondition
+
+
+def condition_changed(condition, old_objective_id=None):
+    """Bring the matrix up to date after a condition was saved.
+
+    If the condition moved from ``old_objective_id`` to another objective, its
+    ProjectObjectiveConditions follow it, and the old objective's levels are recalculated.
+    """
+    if old_objective_id is not None and old_objective_id != condition.objective_id:
+        ProjectObjectiveCondition.objects.filter(condition=condition).update(
+            objective_id=condition.objective_id
+        )
+        rebuild_level_counters(objective_ids=[old_objective_id])
+        recalculate_levels(objective_ids=[old_objective_id])
+
+    # recounts the condition's objective, which also takes a change of level into account
+    propagate_conditions([condition.pk])
+
+
+def level_value_changed(level_id):
+    """Bring levels, quality indicators and commitments up to date after the value of a level
+    changed."""
+    # the value decides the order of levels, and so the level achieved, in every objective
+    # that has conditions at this level
+    objective_ids = set(
+        Condition.objects.filter(level_id=level_id).values_list(
+            "objective_id", flat=True
+        )
+    )
+    recalculate_levels(objective_ids=objective_ids)
+    # commitments to the level, and to levels compared with it, may be met or not any more
+    refresh_commitments_met(objective_ids=objective_ids)
+    # projects that have achieved the level count its value in their quality indicator
+    refresh_quality_indicators(
+        ProjectObjective.objects.filter(level_achieved_id=level_id).values_list(
+            "project_id", flat=True
+        )
+    )
+
+
+def objective_weight_changed(objective_id):
+    """Bring quality indicators up to date after the weight of an objective changed."""
+    refresh_quality_indicators(
+        ProjectObjective.objects.filter(
+            objective_id=objective_id, level_achieved__isnull=False
+        ).values_list("project_id", flat=True)
+    )
@@ -0,0 +1,199 @@
+"""
+The view model of the project detail page.
+
+A ProjectDetail loads everything the page shows about a project - its objectives with their
+statuses, the conditions and commitments at each level, and the work cycles and reasons the
+page lists - with one query per table. It then arranges them as the page nests them: objective
+groups, objectives, levels, and the conditions and commitments at each level. The number of
+queries doesn't depend on the number of objectives, conditions or cycles.
+"""
+
+from dataclasses import dataclass, field
+
+from framework.models import Reason, WorkCycle
+
+from .models import Commitment, Project, ProjectObjective, ProjectObjectiveCondition
+
+
+@dataclass
+class LevelSection:
+    level: object
+    # the ProjectObjectiveConditions at the level
+    conditions: list = field(default_factory=list)
+    # a Commitment for each cycle, stored or not
+    commitments: list = field(default_factory=list)
+
+
+@dataclass
+class ObjectiveSection:
+    projectobjective: ProjectObjective
+    levels: list = field(default_factory=list)
+
+
+@dataclass
+class GroupSection:
+    group: object
+    objectives: list = field(default_factory=list)
+
+
+def current_work_cycle_name(work_cycles):
+    """Equivalent to WorkCycle.name_of_current(), from already loaded ``work_cycles``."""
+    return ", ".join(
+        work_cycle.name for work_cycle in work_cycles if work_cycle.is_current
+    )
+
+
+class CommitmentIndex:
+    """The commitments that have been made, looked up by project, objective, level and cycle.
+
+    A project's commitments are loaded in one query the first time one of them is looked up,
+    or provided up front by whoever has already loaded them.
+    """
+
+    def __init__(self, commitments=(), project_ids=()):
+        self.keys = {
+            (c.project_id, c.objective_id, c.level_id, c.work_cycle_id)
+            for c in commitments
+            if c.committed
+        }
+        self.project_ids = set(project_ids)
+
+    def is_committed(self, project_id, objective_id, level_id, work_cycle_id):
+        if project_id not in self.project_ids:
+            self.keys.update(
+                Commitment.objects.filter(
+                    project_id=project_id, committed=True
+                ).values_list("project_id", "objective_id", "level_id", "work_cycle_id")
+            )
+            self.project_ids.add(project_id)
+        return (project_id, objective_id, level_id, work_cycle_id) in self.keys
+
+
+@dataclass
+class CurrentCommitment:
+    commitment: Commitment
+    projectobjective: ProjectObjective
+
+    @property
+    def met(self):
+        return self.commitment.met
+
+
+def current_commitments(commitments, projectobjectives):
+    """Return a CurrentCommitment for each of ``commitments`` in a current cycle.
+
+    ``projectobjectives`` maps objective ids to the project's ProjectObjectives.
+    """
+    return [
+        CurrentCommitment(commitment, projectobjectives[commitment.objective_id])
+        for commitment in commitments
+        if commitment.work_cycle.is_current
+    ]
+
+
+def load_current_commitments(project_id):
+    """Return the project's commitments for the current cycles, in two queries."""
+    commitments = Commitment.objects.filter(
+        project_id=project_id, committed=True, work_cycle__is_current=True
+    ).select_related("objective", "level", "work_cycle")
+    projectobjectives = ProjectObjective.objects.filter(
+        project_id=project_id
+    ).select_related("objective", "level_achieved")
+    return current_commitments(
+        commitments,
+        {
+            projectobjective.objective_id: projectobjective
+            for projectobjective in projectobjectives
+        },
+    )
+
+
+@dataclass
+class ProjectDetail:
+    project: Project
+    work_cycles: list
+    unstarted_reasons: list
+    groups: list
+    current_commitments: list
+
+    @property
+    def current_work_cycle_name(self):
+        return current_work_cycle_name(self.work_cycles)
+
+    @classmethod
+    def load(cls, project_id):
+        project = Project.objects.select_related(
+            "group", "agreement_status", "last_review_status"
+        ).get(id=project_id)
+        work_cycles = list(WorkCycle.objects.all())
+        projectobjectives = list(
+            ProjectObjective.objects.filter(project=project).select_related(
+                "objective__group", "level_achieved", "unstarted_reason"
+            )
+        )
+        conditions = (
+            ProjectObjectiveCondition.objects.filter(project=project)
+            .select_related("condition__level")
+            .order_by("condition__level__value", "condition_id")
+        )
+        # only commitments that have been made are stored
+        stored = list(
+            Commitment.objects.filter(project=project, committed=True).select_related(
+                "objective", "level", "work_cycle"
+            )
+        )
+
+        by_objective = {
+            projectobjective.objective_id: projectobjective
+            for projectobjective in projectobjectives
+        }
+        sections = {
+            objective_id: ObjectiveSection(projectobjective)
+            for objective_id, projectobjective in by_objective.items()
+        }
+
+        # the levels of each objective that have conditions, in order of value
+        levels = {}
+        for condition in conditions:
+            level = condition.condition.level
+            key = (condition.objective_id, level.id)
+            if key not in levels:
+                levels[key] = LevelSection(level)
+                sections[condition.objective_id].levels.append(levels[key])
+            levels[key].conditions.append(condition)
+
+        # a commitment for each cycle at each of those levels; only the commitments that have
+        # been made are stored, and the others are unsaved, with committed False
+        committed = {
+            (commitment.objective_id, commitment.level_id, commitment.work_cycle_id): (
+                commitment
+            )
+            for commitment in stored
+        }
+        for (objective_id, level_id), section in levels.items():
+            for work_cycle in work_cycles:
+                commitment = committed.get((objective_id, level_id, work_cycle.id))
+                if commitment is None:
+                    commitment = Commitment(
+                        project_id=project.id,
+                        objective_id=objective_id,
+                        committed=False,
+                    )
+                commitment.level = section.level
+                commitment.work_cycle = work_cycle
+                section.commitments.append(commitment)
+
+        groups = []
+        for projectobjective in projectobjectives:
+            group = projectobjective.objective.group
+            if not groups or groups[-1].group != group:
+                groups.append(GroupSection(group))
+            groups[-1].objectives.append(sections[projectobjective.objective_id])
+
+        return cls(
+            project=project,
+            work_cycles=work_cycles,
+            unstarted_reasons=list(Reason.objects.all()),
+            groups=groups,
+            current_commitments=current_commitments(stored, by_objective),
+        )
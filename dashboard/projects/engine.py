@@ -0,0 +1,149 @@
+"""
+An in-memory engine for levels and quality indicators.
+
+A Snapshot loads everything that determines levels and quality indicators - condition statuses,
+condition levels, level values and objective weights - in one query per table. From there it
+computes the level achieved by every ProjectObjective and the quality indicator of every Project
+in a single pass, without further queries. Changes can be applied to a snapshot to answer
+"what if" questions without touching the database.
+
+levels.recalculate_all_levels() recomputes everything from a snapshot, rather than row by row.
+"""
+
+from dataclasses import dataclass, replace
+
+from framework.models import Condition, Level, Objective
+
+from .models import ProjectObjective, ProjectObjectiveCondition
+
+
+@dataclass(frozen=True)
+class Snapshot:
+    # (project_id, objective_id, condition_id, status) for each ProjectObjectiveCondition
+    statuses: tuple
+    # condition_id -> (objective_id, level_id)
+    conditions: dict
+    # level_id -> value
+    level_values: dict
+    # objective_id -> weight
+    weights: dict
+    # (project_id, objective_id) -> stored level_achieved id (or None)
+    stored_levels: dict
+    # (project_id, objective_id) -> ProjectObjective id
+    projectobjective_ids: dict
+
+    @classmethod
+    def load(cls):
+        conditions = Condition.objects.order_by().values_list(
+            "id", "objective_id", "level_id"
+        )
+        projectobjectives = list(
+            ProjectObjective.objects.order_by().values_list(
+                "id", "project_id", "objective_id", "level_achieved_id"
+            )
+        )
+        return cls(
+            statuses=tuple(
+                ProjectObjectiveCondition.objects.order_by().values_list(
+                    "project_id", "objective_id", "condition_id", "status"
+                )
+            ),
+            conditions={
+                condition_id: (objective_id, level_id)
+                for condition_id, objective_id, level_id in conditions
+            },
+            level_values=dict(Level.objects.order_by().values_list("id", "value")),
+            weights=dict(Objective.objects.order_by().values_list("id", "weight")),
+            stored_levels={
+                (project_id, objective_id): level_id
+                for _, project_id, objective_id, level_id in projectobjectives
+            },
+            projectobjective_ids={
+                (project_id, objective_id): projectobjective_id
+                for projectobjective_id, project_id, objective_id, _ in projectobjectives
+            },
+        )
+
+    def with_changes(self, statuses=None, level_values=None, weights=None):
+        """Return a copy of the snapshot with some values changed.
+
+        ``statuses`` maps (project_id, condition_id) to a new status; ``level_values`` and
+        ``weights`` map level and objective ids to new values.
+        """
+        changed = {}
+        if statuses:
+            changed["statuses"] = tuple(
+                (
+                    project_id,
+                    objective_id,
+                    condition_id,
+                    statuses.get((project_id, condition_id), status),
+                )
+                for project_id, objective_id, condition_id, status in self.statuses
+            )
+        if level_values:
+            changed["level_values"] = {**self.level_values, **level_values}
+        if weights:
+            changed["weights"] = {**self.weights, **weights}
+        return replace(self, **changed)
+
+    def undone_counts(self):
+        """Return the number of undone conditions at each level of each ProjectObjective, keyed
+        by (project_id, objective_id, level_id), for every level that has conditions.
+
+        Equivalent to the ProjectObjectiveLevel counters, for every ProjectObjective at once.
+        """
+        counts = {}
+        for project_id, _, condition_id, status in self.statuses:
+            objective_id, level_id = self.conditions[condition_id]
+            key = (project_id, objective_id, level_id)
+            counts[key] = counts.get(key, 0) + (
+                status in ProjectObjectiveCondition.UNDONE_STATUSES
+            )
+        return counts
+
+    def achieved_levels(self, undone_counts=None):
+        """Return the level achieved by each ProjectObjective, as calculated from the statuses,
+        or from ``undone_counts`` if they have been counted already.
+
+        Equivalent to ProjectObjective.achieved_level, for every ProjectObjective at once.
+        """
+        if undone_counts is None:
+            undone_counts = self.undone_counts()
+
+        # the levels of each objective that have conditions, in order of value
+        objective_levels = {}
+        for objective_id, level_id in self.conditions.values():
+            objective_levels.setdefault(objective_id, set()).add(level_id)
+        for objective_id, level_ids in objective_levels.items():
+            objective_levels[objective_id] = sorted(
+                level_ids, key=self.level_values.__getitem__
+            )
+
+        achieved = {}
+        for project_id, objective_id in self.stored_levels:
+            level_achieved = None
+            for level_id in objective_levels.get(objective_id, []):
+                if undone_counts.get((project_id, objective_id, level_id)):
+                    break
+                level_achieved = level_id
+            achieved[(project_id, objective_id)] = level_achieved
+        return achieved
+
+    def quality_indicators(self, levels=None):
+        """Return the quality indicator of each Project that has objectives.
+
+        ``levels`` maps (project_id, objective_id) to a level id, and defaults to the stored
+        level_achieved values, which makes the result equivalent to Project.quality_indicator.
+        Pass achieved_levels() to take changes to statuses into account.
+        """
+        if levels is None:
+            levels = self.stored_levels
+        totals = {}
+        for (project_id, objective_id), level_id in levels.items():
+            totals.setdefault(project_id, 0)
+            if level_id is not None:
+                totals[project_id] += (
+                    self.level_values[level_id] * self.weights[objective_id]
+                )
+        return totals
@@ -0,0 +1,140 @@
+"""
+Exports of the project data, for reporting, as CSV or as newline-delimited JSON.
+
+Each export is a table: the status of every objective of each project, the QI history of each
+project, or the commitments that have been made. Its rows come from a single query, read with
+.iterator() and written out as they arrive, so that memory stays flat however many projects
+there are. The statuses and QI history are read from the project summaries, which already hold
+them, rather than from the matrix itself.
+"""
+
+import csv
+import itertools
+import json
+
+from asgiref.sync import sync_to_async
+
+from framework.models import Objective, WorkCycle
+
+from .models import Commitment, Project
+from .summary import refresh_missing_summaries
+
+FORMATS = {
+    "csv": "text/csv",
+    "ndjson": "application/x-ndjson",
+}
+
+# the number of lines sent at a time
+BATCH_SIZE = 500
+
+
+def summaries():
+    """Return the projects, with the statuses and QI history from their summaries."""
+    refresh_missing_summaries()
+    return Project.objects.values_list(
+        "id",
+        "name",
+        "group__name",
+        "current_qi",
+        "summary__statuses",
+        "summary__quality_history",
+    )
+
+
+def statuses():
+    """The status of each objective of each project, with a column per objective."""
+    objectives = list(Objective.objects.values_list("name", flat=True))
+    fields = ["id", "project", "group", *objectives]
+    projects = summaries()
+
+    def rows():
+        for project_id, name, group, _, statuses, _ in projects.iterator():
+            statuses = dict(statuses)
+            yield [
+                project_id,
+                name,
+                group,
+                *(statuses.get(objective) for objective in objectives),
+            ]
+
+    return fields, rows()
+
+
+def quality_indicators():
+    """The current QI of each project, and its QI in each cycle, with a column per cycle."""
+    work_cycles = list(WorkCycle.objects.values_list("id", "name"))
+    fields = ["id", "project", "group", "current", *(name for _, name in work_cycles)]
+    projects = summaries()
+
+    def rows():
+        for project_id, name, group, current_qi, _, history in projects.iterator():
+            history = dict(history)
+            yield [
+                project_id,
+                name,
+                group,
+                current_qi,
+                *(history.get(work_cycle_id) for work_cycle_id, _ in work_cycles),
+            ]
+
+    return fields, rows()
+
+
+def commitments():
+    """The commitments that have been made, and whether each is met."""
+    fields = ["project_id", "project", "objective", "level", "cycle", "met"]
+    rows = (
+        Commitment.objects.filter(committed=True)
+        .order_by(
+            "project__group", "project__name", "objective", "level__value", "work_cycle"
+        )
+        .values_list(
+            "project_id",
+            "project__name",
+            "objective__name",
+            "level__name",
+            "work_cycle__name",
+            "met",
+        )
+    )
+    return fields, rows.iterator()
+
+
+EXPORTS = {
+    "statuses": statuses,
+    "quality_indicators": quality_indicators,
+    "commitments": commitments,
+}
+
+
+class Echo:
+    # a file-like object for csv.writer, which returns what is written instead of keeping it
+    def write(self, value):
+        return value
+
+
+def export_lines(export, format):
+    """Return an iterator over the lines of ``export``, one of EXPORTS, in ``format``, one of
+    FORMATS. The columns are read straight away, the rows only as the lines are."""
+    fields, rows = EXPORTS[export]()
+    if format == "csv":
+        writer = csv.writer(Echo())
+        return itertools.chain(
+            [writer.writerow(fields)], (writer.writerow(row) for row in rows)
+        )
+    return (json.dumps(dict(zip(fields, row))) + "\n" for row in rows)
+
+
+def batches(lines, size=BATCH_SIZE):
+    """Join ``lines`` into batches of ``size``, to be sent or written at once."""
+    while batch := "".join(itertools.islice(lines, size)):
+        yield batch
+
+
+async def async_batches(lines, size=BATCH_SIZE):
+    """Like batches(), for a response served by an ASGI server, which would otherwise read the
+    whole of a synchronous iterator before sending any of it."""
+    # each batch is read in the same thread, which holds the database connection
+    next_batch = sync_to_async(lambda: "".join(itertools.islice(lines, size)))
+    while batch := await next_batch():
+        yield batch
@@ -0,0 +1,294 @@
+"""
+Maintenance of ProjectObjective.level_achieved and Project.current_qi.
+
+A ProjectObjectiveLevel row counts the undone conditions of each level of each ProjectObjective.
+Toggling a condition adjusts a single counter, and the level achieved is then read off the
+counters in level order, without re-aggregating the conditions.
+
+Whenever a level achieved changes, the stored quality indicator and the summary of its Project,
+and whether the commitments of its ProjectObjective are met, are refreshed, so that pages can
+display them instead of aggregating.
+"""
+
+from itertools import groupby
+
+from django.db import transaction
+from django.db.models import Count, Exists, F, OuterRef, Q, Subquery, Sum
+from django.db.models.functions import Coalesce
+
+from framework.models import Level
+
+from .caching import bump_versions
+from .engine import Snapshot
+from .models import (
+    Commitment,
+    Project,
+    ProjectObjective,
+    ProjectObjectiveCondition,
+    ProjectObjectiveLevel,
+    QI,
+)
+from .summary import refresh_summaries
+
+
+def level_from_counts(counts):
+    """Return the id of the level achieved, given (level_id, undone_count) pairs in level order.
+
+    Mirrors ProjectObjective.achieved_level: the first level with any undone condition stops
+    progress.
+    """
+    level_achieved = None
+    for level_id, undone_count in counts:
+        if undone_count:
+            return level_achieved
+        level_achieved = level_id
+    return level_achieved
+
+
+def scope(project_ids=None, objective_ids=None):
+    """Filter arguments restricting a query to the given projects and objectives."""
+    filters = {}
+    if project_ids is not None:
+        filters["project_id__in"] = project_ids
+    if objective_ids is not None:
+        filters["objective_id__in"] = objective_ids
+    return filters
+
+
+def rebuild_level_counters(project_ids=None, objective_ids=None):
+    """Recount the undone conditions of the given projects and objectives (default: all)."""
+    counts = (
+        ProjectObjectiveCondition.objects.filter(
+            **scope(project_ids, objective_ids)
+        )
+        .values("project_id", "objective_id", "condition__level_id")
+        .annotate(
+            undone_count=Count(
+                "id",
+                filter=Q(status__in=ProjectObjectiveCondition.UNDONE_STATUSES),
+            )
+        )
+        .order_by()
+    )
+    with transaction.atomic():
+        ProjectObjectiveLevel.objects.filter(
+            **scope(project_ids, objective_ids)
+        ).delete()
+        ProjectObjectiveLevel.objects.bulk_create(
+            ProjectObjectiveLevel(
+                project_id=count["project_id"],
+                objective_id=count["objective_id"],
+                level_id=count["condition__level_id"],
+                undone_count=count["undone_count"],
+            )
+            for count in counts
+        )
+
+
+def recalculate_levels(project_ids=None, objective_ids=None):
+    """Update level_achieved of the given projects and objectives (default: all) from the
+    counters.
+
+    Returns the ProjectObjectives whose level changed.
+    """
+    counters = (
+        ProjectObjectiveLevel.objects.filter(**scope(project_ids, objective_ids))
+        .order_by("project_id", "objective_id", "level__value")
+        .values_list("project_id", "objective_id", "level_id", "undone_count")
+    )
+    levels = {
+        key: level_from_counts((level_id, undone) for _, _, level_id, undone in rows)
+        for key, rows in groupby(counters, key=lambda row: row[:2])
+    }
+
+    changed = []
+    for projectobjective in ProjectObjective.objects.filter(
+        **scope(project_ids, objective_ids)
+    ).only("id", "project_id", "objective_id", "level_achieved_id"):
+        level_id = levels.get(
+            (projectobjective.project_id, projectobjective.objective_id)
+        )
+        if projectobjective.level_achieved_id != level_id:
+            projectobjective.level_achieved_id = level_id
+            changed.append(projectobjective)
+    ProjectObjective.objects.bulk_update(changed, ["level_achieved"])
+    changed_project_ids = {projectobjective.project_id for projectobjective in changed}
+    refresh_commitments_met(
+        changed_project_ids,
+        {projectobjective.objective_id for projectobjective in changed},
+    )
+    refresh_quality_indicators(changed_project_ids)
+    refresh_summaries(changed_project_ids)
+    return changed
+
+
+def recalculate_all_levels():
+    """Recount every condition and recalculate every level_achieved, then refresh every
+    commitment and quality indicator, and rebuild every project summary.
+
+    Everything is computed by an engine.Snapshot, loaded with one query per table, and written
+    with bulk queries. Returns the number of ProjectObjectives whose level changed.
+    """
+    with transaction.atomic():
+        snapshot = Snapshot.load()
+        undone_counts = snapshot.undone_counts()
+        ProjectObjectiveLevel.objects.all().delete()
+        ProjectObjectiveLevel.objects.bulk_create(
+            ProjectObjectiveLevel(
+                project_id=project_id,
+                objective_id=objective_id,
+                level_id=level_id,
+                undone_count=undone_count,
+            )
+            for (project_id, objective_id, level_id), undone_count in undone_counts.items()
+        )
+
+        levels = snapshot.achieved_levels(undone_counts)
+        changed = [
+            ProjectObjective(
+                id=snapshot.projectobjective_ids[key], level_achieved_id=level_id
+            )
+            for key, level_id in levels.items()
+            if snapshot.stored_levels[key] != level_id
+        ]
+        ProjectObjective.objects.bulk_update(changed, ["level_achieved"])
+        refresh_commitments_met()
+
+        # the levels may be unchanged while the rows they add up have been created or deleted
+        quality_indicators = snapshot.quality_indicators(levels)
+        projects = []
+        for project in Project.objects.only("id", "current_qi"):
+            if project.current_qi != quality_indicators.get(project.id, 0):
+                project.current_qi = quality_indicators.get(project.id, 0)
+                projects.append(project)
+        Project.objects.bulk_update(projects, ["current_qi"])
+        bump_versions()
+        refresh_summaries()
+        return len(changed)
+
+
+def record_status_change(poc, old_status):
+    """Adjust the counter for a condition whose status changed from ``old_status``, and update
+    the level achieved by its ProjectObjective.
+
+    ``old_status`` is None for a newly created condition. Call this in the same transaction as
+    the change to the condition.
+    """
+    undone = ProjectObjectiveCondition.UNDONE_STATUSES
+    was_undone = old_status in undone
+    is_undone = poc.status in undone
+    if old_status is not None and was_undone == is_undone:
+        return
+
+    delta = (1 if is_undone else 0) - (1 if was_undone else 0)
+    key = dict(project_id=poc.project_id, objective_id=poc.objective_id)
+    if not ProjectObjectiveLevel.objects.filter(
+        level__condition=poc.condition_id, **key
+    ).update(undone_count=F("undone_count") + delta):
+        # no counter yet for this level, so count it from scratch
+        rebuild_level_counters([poc.project_id], [poc.objective_id])
+
+    counts = (
+        ProjectObjectiveLevel.objects.filter(**key)
+        .order_by("level__value")
+        .values_list("level_id", "undone_count")
+    )
+    level_id = level_from_counts(counts)
+    if (
+        ProjectObjective.objects.filter(**key)
+        .exclude(level_achieved_id=level_id)
+        .update(level_achieved_id=level_id)
+    ):
+        refresh_commitments_met([poc.project_id], [poc.objective_id])
+        refresh_quality_indicators([poc.project_id])
+        refresh_summaries([poc.project_id])
+
+
+def record_status_changes(changes):
+    """Adjust the counters for conditions whose statuses changed, given (condition,
+    old_status) pairs, and update the levels achieved by their ProjectObjectives.
+
+    Like record_status_change(), for many conditions at once: each counter is adjusted once, by
+    the sum of the changes at its level, and each ProjectObjective recalculated once. Call this
+    in the same transaction as the changes, holding the locks on the conditions.
+    """
+    undone = ProjectObjectiveCondition.UNDONE_STATUSES
+    deltas = {}
+    for poc, old_status in changes:
+        delta = (poc.status in undone) - (old_status in undone)
+        if delta:
+            key = (poc.project_id, poc.objective_id, poc.condition.level_id)
+            deltas[key] = deltas.get(key, 0) + delta
+
+    uncounted = set()
+    for (project_id, objective_id, level_id), delta in deltas.items():
+        if delta and not ProjectObjectiveLevel.objects.filter(
+            project_id=project_id, objective_id=objective_id, level_id=level_id
+        ).update(undone_count=F("undone_count") + delta):
+            uncounted.add((project_id, objective_id))
+    for project_id, objective_id in uncounted:
+        # no counter yet for this level, so count it from scratch
+        rebuild_level_counters([project_id], [objective_id])
+
+    if deltas:
+        recalculate_levels(
+            {project_id for project_id, _, _ in deltas},
+            {objective_id for _, objective_id, _ in deltas},
+        )
+
+
+def refresh_commitments_met(project_ids=None, objective_ids=None):
+    """Store whether the commitments of the given projects and objectives (default: all) are
+    met, that is whether the level achieved is at least the level committed to.
+
+    This is a single UPDATE, with the comparison made by a subquery.
+    """
+    Commitment.objects.filter(**scope(project_ids, objective_ids)).update(
+        met=Exists(
+            ProjectObjective.objects.filter(
+                project=OuterRef("project"),
+                objective=OuterRef("objective"),
+                level_achieved__value__gte=Level.objects.filter(
+                    pk=OuterRef(OuterRef("level"))
+                ).values("value"),
+            )
+        )
+    )
+    bump_versions(project_ids)
+
+
+def refresh_quality_indicators(project_ids=None):
+    """Store the current quality indicator of the given projects (default: all).
+
+    This is a single UPDATE, with the totals calculated by a subquery.
+    """
+    total = (
+        ProjectObjective.objects.filter(
+            project=OuterRef("pk"), level_achieved__isnull=False
+        )
+        .order_by()
+        .values("project")
+        .annotate(total=Sum(F("level_achieved__value") * F("objective__weight")))
+        .values("total")
+    )
+    projects = Project.objects.all()
+    if project_ids is not None:
+        projects = projects.filter(id__in=project_ids)
+    projects.update(current_qi=Coalesce(Subquery(total), 0))
+    bump_versions(project_ids)
+
+
+def apply_quality_indicators(workcycle_ids):
+    """Copy each project's current quality indicator to its QI for the given cycles.
+
+    This is a single UPDATE, whatever the number of cycles and projects. Returns the number of
+    QIs updated.
+    """
+    with transaction.atomic():
+        updated = QI.objects.filter(workcycle_id__in=workcycle_ids).update(
+            value=Subquery(
+                Project.objects.filter(pk=OuterRef("project_id")).values("current_qi")
+            )
+        )
+        refresh_summaries()
+    return updated
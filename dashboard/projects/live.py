@@ -0,0 +1,224 @@
+"""
+Live updates of the project pages, pushed to open pages as server-sent events.
+
+Once the changes of a transaction have been recorded by projects.changes, the ids of the
+projects concerned are published. stream() passes what is published to each open page, which
+renders the fragments the page needs, for its user, and sends them as an event. A page that is
+sent nothing, such as under a WSGI server, asks status_changes for the same fragments every
+minute instead.
+
+Within a single process, messages go through a LocalBroker. With LIVE_UPDATES_REDIS_URL set,
+they go through a Redis channel instead, so that the updates made by any process reach the
+clients of all of them. Each process then holds a single subscription to the channel, which it
+shares between all of its clients.
+"""
+
+import asyncio
+import functools
+import json
+import logging
+import threading
+
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+CHANNEL = "projects:live"
+
+# how often to send something when there's nothing to send, so that proxies don't close the
+# connection
+KEEPALIVE = 15
+
+
+class LocalSubscription:
+    def __init__(self, broker):
+        self.broker = broker
+        self.loop = asyncio.get_running_loop()
+        self.queue = asyncio.Queue()
+
+    def deliver(self, message):
+        # messages are published from whichever thread commits the change
+        self.loop.call_soon_threadsafe(self.queue.put_nowait, message)
+
+    async def get(self, timeout):
+        """Return the next message, or None if there's none within ``timeout`` seconds."""
+        try:
+            return await asyncio.wait_for(self.queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+    async def close(self):
+        with self.broker.lock:
+            self.broker.subscriptions.discard(self)
+
+
+class LocalBroker:
+    """Passes messages to the subscribers in the same process."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.subscriptions = set()
+
+    def publish(self, message):
+        with self.lock:
+            subscriptions = list(self.subscriptions)
+        for subscription in subscriptions:
+            try:
+                subscription.deliver(message)
+            except RuntimeError:
+                # the subscriber's event loop has closed
+                with self.lock:
+                    self.subscriptions.discard(subscription)
+
+    async def subscribe(self):
+        subscription = LocalSubscription(self)
+        with self.lock:
+            self.subscriptions.add(subscription)
+        return subscription
+
+
+class RedisSubscription:
+    def __init__(self, pubsub):
+        self.pubsub = pubsub
+
+    async def get(self, timeout):
+        """Return the next message, or None if there's none within ``timeout`` seconds."""
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + timeout
+        while (remaining := deadline - loop.time()) > 0:
+            # None also stands for a message that was ignored, such as the confirmation of
+            # the subscription, so it only means there's none once the time is up
+            message = await self.pubsub.get_message(timeout=remaining)
+            if message is not None:
+                return message["data"].decode()
+        return None
+
+    async def close(self):
+        await self.pubsub.aclose()
+
+
+class RedisBroker:
+    """Passes messages through a Redis channel, to the subscribers in every process."""
+
+    def __init__(self, client, async_client, channel=CHANNEL):
+        self.client = client
+        self.async_client = async_client
+        self.channel = channel
+
+    @classmethod
+    def from_url(cls, url):
+        # only needed when Redis is configured
+        import redis
+        import redis.asyncio
+
+        return cls(redis.Redis.from_url(url), redis.asyncio.Redis.from_url(url))
+
+    def publish(self, message):
+        self.client.publish(self.channel, message)
+
+    async def subscribe(self):
+        pubsub = self.async_client.pubsub(ignore_subscribe_messages=True)
+        await pubsub.subscribe(self.channel)
+        return RedisSubscription(pubsub)
+
+
+class SharedSubscription(LocalSubscription):
+    async def close(self):
+        await super().close()
+        await self.broker.unsubscribed()
+
+
+class SharedBroker(LocalBroker):
+    """Shares a single subscription to ``broker`` between all the subscribers in the process,
+    rather than each holding a connection of its own. The subscription is taken when the first
+    subscriber arrives, and dropped when the last one leaves."""
+
+    def __init__(self, broker):
+        super().__init__()
+        self.broker = broker
+        self.relay = None
+        self.ready = None
+
+    def publish(self, message):
+        self.broker.publish(message)
+
+    async def subscribe(self):
+        subscription = SharedSubscription(self)
+        with self.lock:
+            self.subscriptions.add(subscription)
+        if self.relay is None or self.relay.done():
+            self.ready = asyncio.Event()
+            self.relay = asyncio.create_task(self.run_relay(self.ready))
+        await self.ready.wait()
+        return subscription
+
+    async def unsubscribed(self):
+        with self.lock:
+            if self.subscriptions:
+                return
+        relay, self.relay = self.relay, None
+        if relay is not None:
+            relay.cancel()
+            # lets the relay close its subscription
+            await asyncio.gather(relay, return_exceptions=True)
+
+    async def run_relay(self, ready):
+        try:
+            subscription = await self.broker.subscribe()
+        except Exception:
+            logger.warning("Could not subscribe to live updates", exc_info=True)
+            ready.set()
+            return
+        ready.set()
+        try:
+            while True:
+                message = await subscription.get(KEEPALIVE)
+                if message is not None:
+                    super().publish(message)
+        except Exception:
+            logger.warning("Lost the subscription to live updates", exc_info=True)
+        finally:
+            await subscription.close()
+
+
+@functools.cache
+def get_broker():
+    if settings.LIVE_UPDATES_REDIS_URL:
+        return SharedBroker(RedisBroker.from_url(settings.LIVE_UPDATES_REDIS_URL))
+    return LocalBroker()
+
+
+def publish(project_ids):
+    """Publish ``project_ids``, the projects whose changes have just been recorded, with None
+    standing for every project."""
+    if not project_ids:
+        return
+    # the change has been made already, so a broker that's down mustn't fail the request
+    try:
+        get_broker().publish(json.dumps(project_ids))
+    except Exception:
+        logger.warning("Could not publish live updates", exc_info=True)
+
+
+def event(name, data=""):
+    """Return a server-sent event, with ``data`` split over as many lines as it has."""
+    lines = "".join(f"data: {line}\n" for line in data.split("\n"))
+    return f"event: {name}\n{lines}\n"
+
+
+async def stream(broker, changes, keepalive=KEEPALIVE):
+    """Relay the messages published through ``broker`` as server-sent events: ``changes`` is
+    awaited with the project ids of each message, and returns the event to send for them, if
+    any."""
+    subscription = await broker.subscribe()
+    try:
+        # a comment straight away, so the client knows it's subscribed
+        yield ": subscribed\n\n"
+        while True:
+            message = await subscription.get(keepalive)
+            if message is None:
+                yield ": keepalive\n\n"
+            elif text := await changes(json.loads(message)):
+                yield text
+    finally:
+        await subscription.close()
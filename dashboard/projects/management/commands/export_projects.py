@@ -0,0 +1,32 @@
+from django.core.management.base import BaseCommand
+
+from projects.export import EXPORTS, FORMATS, batches, export_lines
+
+
+class Command(BaseCommand):
+    help = (
+        "Write a table of the project data for reporting: the objective statuses, the QI "
+        "history or the commitments of every project"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("export", choices=list(EXPORTS))
+        parser.add_argument(
+            "--format",
+            choices=list(FORMATS),
+            default="csv",
+            help="The format to write the table in (default: csv)",
+        )
+        parser.add_argument(
+            "--output",
+            help="The file to write the table to (default: standard output)",
+        )
+
+    def handle(self, *args, **options):
+        lines = export_lines(options["export"], options["format"])
+        if options["output"]:
+            with open(options["output"], "w", newline="") as output:
+                output.writelines(batches(lines))
+        else:
+            for batch in batches(lines):
+                self.stdout.write(batch, ending="")
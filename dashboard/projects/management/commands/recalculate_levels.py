@@ -0,0 +1,20 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from projects.levels import recalculate_all_levels
+from projects.models import ProjectObjective
+
+
+class Command(BaseCommand):
+    help = "Recalculate the level achieved by every project objective"
+
+    def handle(self, *args, **options):
+        start = time.monotonic()
+        updated = recalculate_all_levels()
+        elapsed = time.monotonic() - start
+
+        self.stdout.write(
+            f"Recalculated {ProjectObjective.objects.count()} objective statuses: "
+            f"{updated} changed in {elapsed:.2f}s."
+        )
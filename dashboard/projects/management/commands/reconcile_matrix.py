@@ -0,0 +1,33 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from projects.matrix import reconcile
+
+
+class Command(BaseCommand):
+    help = (
+        "Find missing and orphaned rows in the project matrix, and create or delete them"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--dry-run",
+            action="store_true",
+            help="Report the differences without changing anything",
+        )
+
+    def handle(self, *args, **options):
+        start = time.monotonic()
+        report = reconcile(fix=not options["dry_run"])
+        elapsed = time.monotonic() - start
+
+        for model_name, counts in report.items():
+            self.stdout.write(
+                f"{model_name}: "
+                + ", ".join(f"{count} {kind}" for kind, count in counts.items())
+            )
+        if options["dry_run"]:
+            self.stdout.write(f"Dry run, nothing changed ({elapsed:.2f}s).")
+        else:
+            self.stdout.write(f"Reconciled in {elapsed:.2f}s.")
@@ -0,0 +1,357 @@
+"""
+Set-based maintenance of the project matrix.
+
+Every Project carries a ProjectObjective for each Objective, a ProjectObjectiveCondition for each
+Condition and a QI for each WorkCycle. The functions here work out which of those rows are
+missing and insert them with a handful of bulk queries, rather than one query per row.
+
+Commitments are not part of the matrix: only the commitments that have been made are stored.
+"""
+
+from django.db import connection, transaction
+
+from framework.models import Condition, Objective, WorkCycle
+
+from .levels import (
+    rebuild_level_counters,
+    recalculate_all_levels,
+    recalculate_levels,
+)
+from .models import (
+    Commitment,
+    Project,
+    ProjectObjective,
+    ProjectObjectiveCondition,
+    QI,
+)
+from .summary import refresh_summaries
+
+
+def insert_ignoring_conflicts(model, fields, keys):
+    """Bulk-insert a ``model`` row for each key in ``keys``.
+
+    ``fields`` names the key columns, in the same order as the values in each key. Rows that
+    already exist are left alone, so this must only be used for models that have a unique
+    constraint over ``fields``.
+    """
+    rows = [model(**dict(zip(fields, key))) for key in dict.fromkeys(keys)]
+    model.objects.bulk_create(rows, ignore_conflicts=True)
+    return len(rows)
+
+
+def create_missing(model, fields, keys, existing):
+    """Bulk-create a ``model`` row for each key in ``keys`` that isn't in ``existing``, and
+    return the number of rows created.
+
+    Unlike insert_ignoring_conflicts() this doesn't rely on a unique constraint, which QI lacks,
+    so the caller must hold a lock that stops the same rows being created concurrently, taken
+    before ``existing`` is read.
+    """
+    existing = set(existing)
+    return insert_ignoring_conflicts(
+        model, fields, (key for key in keys if key not in existing)
+    )
+
+
+def propagate_projects(project_ids):
+    """Make sure the given projects have every row of the matrix."""
+    project_ids = list(project_ids)
+    if not project_ids:
+        return
+
+    objective_ids = list(Objective.objects.values_list("id", flat=True))
+    conditions = list(Condition.objects.values_list("id", "objective_id"))
+    work_cycle_ids = list(WorkCycle.objects.values_list("id", flat=True))
+
+    with transaction.atomic():
+        # concurrent propagations of the same projects take turns, so that neither can miss
+        # the rows the other creates; QI has no unique constraint to fall back on
+        list(
+            Project.objects.select_for_update()
+            .filter(id__in=project_ids)
+            .values_list("id", flat=True)
+        )
+        create_missing(
+            ProjectObjective,
+            ("project_id", "objective_id"),
+            (
+                (project_id, objective_id)
+                for project_id in project_ids
+                for objective_id in objective_ids
+            ),
+            ProjectObjective.objects.filter(project_id__in=project_ids).values_list(
+                "project_id", "objective_id"
+            ),
+        )
+        if create_missing(
+            ProjectObjectiveCondition,
+            ("project_id", "objective_id", "condition_id"),
+            (
+                (project_id, objective_id, condition_id)
+                for project_id in project_ids
+                for condition_id, objective_id in conditions
+            ),
+            ProjectObjectiveCondition.objects.filter(
+                project_id__in=project_ids
+            ).values_list("project_id", "objective_id", "condition_id"),
+        ):
+            rebuild_level_counters(project_ids=project_ids)
+            recalculate_levels(project_ids=project_ids)
+        create_missing(
+            QI,
+            ("project_id", "workcycle_id"),
+            (
+                (project_id, work_cycle_id)
+                for project_id in project_ids
+                for work_cycle_id in work_cycle_ids
+            ),
+            QI.objects.filter(project_id__in=project_ids).values_list(
+                "project_id", "workcycle_id"
+            ),
+        )
+        refresh_summaries(project_ids)
+
+
+def propagate_objectives(objective_ids):
+    """Make sure every project has the rows of the matrix for the given objectives."""
+    objective_ids = list(objective_ids)
+    if not objective_ids:
+        return
+
+    project_ids = list(Project.objects.values_list("id", flat=True))
+    conditions = list(
+        Condition.objects.filter(objective_id__in=objective_ids).values_list(
+            "id", "objective_id"
+        )
+    )
+
+    with transaction.atomic():
+        # the unique constraints guard against rows created concurrently
+        create_missing(
+            ProjectObjective,
+            ("project_id", "objective_id"),
+            (
+                (project_id, objective_id)
+                for project_id in project_ids
+                for objective_id in objective_ids
+            ),
+            ProjectObjective.objects.filter(
+                objective_id__in=objective_ids
+            ).values_list("project_id", "objective_id"),
+        )
+        # an edit to an objective that already has its rows changes no level, and weights are
+        # left to projects.dependencies
+        if create_missing(
+            ProjectObjectiveCondition,
+            ("project_id", "objective_id", "condition_id"),
+            (
+                (project_id, objective_id, condition_id)
+                for project_id in project_ids
+                for condition_id, objective_id in conditions
+            ),
+            ProjectObjectiveCondition.objects.filter(
+                objective_id__in=objective_ids
+            ).values_list("project_id", "objective_id", "condition_id"),
+        ):
+            rebuild_level_counters(objective_ids=objective_ids)
+            recalculate_levels(objective_ids=objective_ids)
+
+
+def propagate_conditions(condition_ids):
+    """Make sure every ProjectObjective has the rows of the matrix for the given conditions."""
+    conditions = list(
+        Condition.objects.filter(id__in=condition_ids).values_list(
+            "id", "objective_id", "level_id"
+        )
+    )
+    if not conditions:
+        return
+
+    objective_ids = {objective_id for _, objective_id, _ in conditions}
+    projects_by_objective = {}
+    for project_id, objective_id in ProjectObjective.objects.filter(
+        objective_id__in=objective_ids
+    ).values_list("project_id", "objective_id"):
+        projects_by_objective.setdefault(objective_id, []).append(project_id)
+
+    with transaction.atomic():
+        insert_ignoring_conflicts(
+            ProjectObjectiveCondition,
+            ("project_id", "objective_id", "condition_id"),
+            (
+                (project_id, objective_id, condition_id)
+                for condition_id, objective_id, _ in conditions
+                for project_id in projects_by_objective.get(objective_id, [])
+            ),
+        )
+        # the new conditions are undone, which may hold back levels already achieved
+        rebuild_level_counters(objective_ids=objective_ids)
+        recalculate_levels(objective_ids=objective_ids)
+
+
+def propagate_work_cycle(work_cycle_id):
+    """Create the QI rows for a newly created WorkCycle, and add it to the project summaries.
+
+    The rows are generated inside the database with an INSERT ... SELECT statement, so the cost
+    doesn't grow with the number of rows in Python. The cycle is new, so none of the rows can
+    exist already.
+    """
+    qi = QI._meta.db_table
+    project = Project._meta.db_table
+
+    with transaction.atomic(), connection.cursor() as cursor:
+        # a QI for each Project
+        cursor.execute(
+            f"""
+            INSERT INTO {qi} (project_id, workcycle_id, value)
+            SELECT p.id, %s, 0
+            FROM {project} p
+            """,
+            [work_cycle_id],
+        )
+        refresh_summaries()
+
+
+def delete_rows(model, ids):
+    """Delete the ``model`` rows with the given ids, in batches that stay within every
+    database's limit on query parameters."""
+    ids = list(ids)
+    for start in range(0, len(ids), 900):
+        model.objects.filter(id__in=ids[start : start + 900]).delete()
+
+
+def diff_rows(rows, expected):
+    """Compare (id, key) ``rows`` with the ``expected`` keys.
+
+    Returns the missing keys and the ids of orphaned rows: rows whose key isn't expected, and
+    all but the first row of any key that is duplicated.
+    """
+    seen = set()
+    orphaned = []
+    for row_id, key in sorted(rows):
+        if key in expected and key not in seen:
+            seen.add(key)
+        else:
+            orphaned.append(row_id)
+    return [key for key in expected if key not in seen], orphaned
+
+
+def reconcile(fix=False):
+    """Compare the matrix with the rows the framework calls for.
+
+    Everything is loaded with one query per table and compared as sets. Returns a dict
+    mapping each model name to counts of its missing and orphaned rows. With ``fix``, missing
+    rows are created and orphaned ones deleted, in bulk and in a single transaction.
+
+    A ProjectObjectiveCondition filed under the wrong objective, which happens when a
+    condition is moved without saving it, is counted as misfiled and moved to the right
+    objective rather than replaced, so that its status is kept.
+    """
+    project_ids = list(Project.objects.values_list("id", flat=True))
+    objective_ids = list(Objective.objects.values_list("id", flat=True))
+    work_cycle_ids = list(WorkCycle.objects.values_list("id", flat=True))
+    condition_objectives = dict(Condition.objects.values_list("id", "objective_id"))
+    # commitments can only be made at the levels that have conditions
+    objective_levels = set(Condition.objects.values_list("objective_id", "level_id"))
+
+    rows = ProjectObjective.objects.order_by().values_list(
+        "id", "project_id", "objective_id"
+    )
+    projectobjectives = diff_rows(
+        (
+            (row_id, (project_id, objective_id))
+            for row_id, project_id, objective_id in rows
+        ),
+        {
+            (project_id, objective_id)
+            for project_id in project_ids
+            for objective_id in objective_ids
+        },
+    )
+
+    rows = ProjectObjectiveCondition.objects.order_by().values_list(
+        "id", "project_id", "objective_id", "condition_id"
+    )
+    misfiled = {}
+    keyed_rows = []
+    for row_id, project_id, objective_id, condition_id in rows:
+        if objective_id != condition_objectives[condition_id]:
+            objective_id = condition_objectives[condition_id]
+            misfiled[row_id] = objective_id
+        keyed_rows.append((row_id, (project_id, objective_id, condition_id)))
+    projectobjectiveconditions = diff_rows(
+        keyed_rows,
+        {
+            (project_id, objective_id, condition_id)
+            for project_id in project_ids
+            for condition_id, objective_id in condition_objectives.items()
+        },
+    )
+    # a misfiled row that duplicates a correctly filed one is deleted instead
+    for row_id in projectobjectiveconditions[1]:
+        misfiled.pop(row_id, None)
+
+    rows = QI.objects.order_by().values_list("id", "project_id", "workcycle_id")
+    qis = diff_rows(
+        (
+            (row_id, (project_id, work_cycle_id))
+            for row_id, project_id, work_cycle_id in rows
+        ),
+        {
+            (project_id, work_cycle_id)
+            for project_id in project_ids
+            for work_cycle_id in work_cycle_ids
+        },
+    )
+
+    # only commitments that have been made are stored, so none can be missing
+    rows = Commitment.objects.order_by().values_list(
+        "id", "objective_id", "level_id", "committed"
+    )
+    commitments = (
+        [],
+        [
+            row_id
+            for row_id, objective_id, level_id, committed in rows
+            if not committed or (objective_id, level_id) not in objective_levels
+        ],
+    )
+
+    diffs = [
+        (ProjectObjective, ("project_id", "objective_id"), projectobjectives),
+        (
+            ProjectObjectiveCondition,
+            ("project_id", "objective_id", "condition_id"),
+            projectobjectiveconditions,
+        ),
+        (QI, ("project_id", "workcycle_id"), qis),
+        (Commitment, (), commitments),
+    ]
+
+    if fix:
+        with transaction.atomic():
+            # orphans go first, so that moving misfiled rows can't clash with them
+            for model, _, (_, orphaned) in diffs:
+                delete_rows(model, orphaned)
+            rows_by_objective = {}
+            for row_id, objective_id in misfiled.items():
+                rows_by_objective.setdefault(objective_id, []).append(row_id)
+            for objective_id, row_ids in rows_by_objective.items():
+                ProjectObjectiveCondition.objects.filter(id__in=row_ids).update(
+                    objective_id=objective_id
+                )
+            for model, fields, (missing, _) in diffs:
+                insert_ignoring_conflicts(model, fields, missing)
+            # recreated ProjectObjectives have no level yet, and any row created, deleted or
+            # moved can change the levels, QIs, commitments and summaries
+            if misfiled or any(
+                missing or orphaned for _, _, (missing, orphaned) in diffs
+            ):
+                recalculate_all_levels()
+
+    report = {
+        model._meta.object_name: {"missing": len(missing), "orphaned": len(orphaned)}
+        for model, _, (missing, orphaned) in diffs
+    }
+    report["ProjectObjectiveCondition"]["misfiled"] = len(misfiled)
+    return report
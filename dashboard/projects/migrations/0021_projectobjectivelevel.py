@@ -0,0 +1,51 @@
+# Generated by Django 5.2.13 on 2026-10-18 16:40
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Count, Q
+
+
+def populate_undone_counts(apps, schema_editor):
+    ProjectObjectiveCondition = apps.get_model("projects", "ProjectObjectiveCondition")
+    ProjectObjectiveLevel = apps.get_model("projects", "ProjectObjectiveLevel")
+    counts = (
+        ProjectObjectiveCondition.objects.values(
+            "project_id", "objective_id", "condition__level_id"
+        )
+        .annotate(undone_count=Count("id", filter=Q(status__in=["", "CA"])))
+        .order_by()
+    )
+    ProjectObjectiveLevel.objects.bulk_create(
+        ProjectObjectiveLevel(
+            project_id=count["project_id"],
+            objective_id=count["objective_id"],
+            level_id=count["condition__level_id"],
+            undone_count=count["undone_count"],
+        )
+        for count in counts
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('framework', '0014_alter_agreementstatus_name_alter_level_name_and_more'),
+        ('projects', '0020_project_current_qi_projectobjective_level_achieved'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProjectObjectiveLevel',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('undone_count', models.IntegerField(default=0)),
+                ('level', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='framework.level')),
+                ('objective', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='framework.objective')),
+                ('project', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='projects.project')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('project', 'objective', 'level'), name='unique_project_objective_level')],
+            },
+        ),
+        migrations.RunPython(populate_undone_counts, migrations.RunPython.noop),
+    ]
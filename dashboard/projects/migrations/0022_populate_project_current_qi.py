@@ -0,0 +1,29 @@
+from django.db import migrations
+from django.db.models import F, OuterRef, Subquery, Sum
+from django.db.models.functions import Coalesce
+
+
+def populate_current_qi(apps, schema_editor):
+    Project = apps.get_model("projects", "Project")
+    ProjectObjective = apps.get_model("projects", "ProjectObjective")
+    total = (
+        ProjectObjective.objects.filter(
+            project=OuterRef("pk"), level_achieved__isnull=False
+        )
+        .order_by()
+        .values("project")
+        .annotate(total=Sum(F("level_achieved__value") * F("objective__weight")))
+        .values("total")
+    )
+    Project.objects.update(current_qi=Coalesce(Subquery(total), 0))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("projects", "0021_projectobjectivelevel"),
+    ]
+
+    operations = [
+        migrations.RunPython(populate_current_qi, migrations.RunPython.noop),
+    ]
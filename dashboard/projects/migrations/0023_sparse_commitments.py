@@ -0,0 +1,23 @@
+from django.db import migrations, models
+
+
+def delete_uncommitted(apps, schema_editor):
+    # only commitments that have been made are stored from now on
+    Commitment = apps.get_model("projects", "Commitment")
+    Commitment.objects.filter(committed=False).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("projects", "0022_populate_project_current_qi"),
+    ]
+
+    operations = [
+        migrations.RunPython(delete_uncommitted, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name="commitment",
+            name="committed",
+            field=models.BooleanField(default=True),
+        ),
+    ]
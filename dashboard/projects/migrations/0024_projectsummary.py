@@ -0,0 +1,56 @@
+# Generated by Django 5.2.13 on 2026-10-18 16:58
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def populate_summaries(apps, schema_editor):
+    Project = apps.get_model("projects", "Project")
+    ProjectObjective = apps.get_model("projects", "ProjectObjective")
+    ProjectSummary = apps.get_model("projects", "ProjectSummary")
+    QI = apps.get_model("projects", "QI")
+    summaries = {
+        project_id: ProjectSummary(
+            project_id=project_id, statuses=[], quality_history=[]
+        )
+        for project_id in Project.objects.values_list("id", flat=True)
+    }
+    for project_id, objective_name, level_name, reason_name in (
+        ProjectObjective.objects.order_by("project_id", "objective").values_list(
+            "project_id",
+            "objective__name",
+            "level_achieved__name",
+            "unstarted_reason__name",
+        )
+    ):
+        summaries[project_id].statuses.append(
+            [objective_name, level_name or reason_name]
+        )
+    for project_id, workcycle_id, value in QI.objects.order_by(
+        "project_id", "workcycle"
+    ).values_list("project_id", "workcycle_id", "value"):
+        summaries[project_id].quality_history.append([workcycle_id, value])
+    ProjectSummary.objects.bulk_create(summaries.values())
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('projects', '0023_sparse_commitments'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProjectSummary',
+            fields=[
+                ('project', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='summary', serialize=False, to='projects.project')),
+                ('statuses', models.JSONField(default=list)),
+                ('quality_history', models.JSONField(default=list)),
+                ('updated', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name_plural': 'Project summaries',
+            },
+        ),
+        migrations.RunPython(populate_summaries, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,37 @@
+# Generated by Django 5.2.13 on 2026-10-18 17:14
+
+from django.db import migrations, models
+from django.db.models import Exists, OuterRef
+
+
+def populate_met(apps, schema_editor):
+    Commitment = apps.get_model("projects", "Commitment")
+    Level = apps.get_model("framework", "Level")
+    ProjectObjective = apps.get_model("projects", "ProjectObjective")
+    Commitment.objects.update(
+        met=Exists(
+            ProjectObjective.objects.filter(
+                project=OuterRef("project"),
+                objective=OuterRef("objective"),
+                level_achieved__value__gte=Level.objects.filter(
+                    pk=OuterRef(OuterRef("level"))
+                ).values("value"),
+            )
+        )
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('projects', '0024_projectsummary'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='commitment',
+            name='met',
+            field=models.BooleanField(default=False, editable=False),
+        ),
+        migrations.RunPython(populate_met, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 5.2.13 on 2026-10-18 17:36
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('projects', '0025_commitment_met'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ChangeCounter',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('version', models.PositiveBigIntegerField(default=0)),
+                ('framework_version', models.PositiveBigIntegerField(default=0)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='ProjectChange',
+            fields=[
+                ('project_id', models.PositiveIntegerField(primary_key=True, serialize=False)),
+                ('version', models.PositiveBigIntegerField(db_index=True)),
+            ],
+        ),
+    ]
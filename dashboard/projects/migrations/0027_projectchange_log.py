@@ -0,0 +1,28 @@
+# Generated by Django 5.2.13 on 2026-10-18 18:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('projects', '0026_changes'),
+    ]
+
+    # the changes recorded so far are dropped: the pages rendered before reload once, as for
+    # any version they don't recognise
+    operations = [
+        migrations.DeleteModel(
+            name='ChangeCounter',
+        ),
+        migrations.DeleteModel(
+            name='ProjectChange',
+        ),
+        migrations.CreateModel(
+            name='ProjectChange',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('project_id', models.PositiveIntegerField(db_index=True, null=True)),
+            ],
+        ),
+    ]
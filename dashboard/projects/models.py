@@ -1,9 +1,9 @@
 from datetime import date, timedelta
 import logging
 
-from django.db import models
+from django.db import models, transaction
 from django.urls import reverse
-from django.db.models import Sum, Count, F, Q
+from django.db.models import Sum, Count, F, Q, Subquery
 from django.utils.functional import cached_property
 
 from framework.models import (
@@ -58,31 +58,19 @@ class Project(models.Model):
         return self.name
 
     def save(self, *args, **kwargs):
-        super().save(*args, **kwargs)
-
-        # when a new Project is added propagate it to all existing Objectives
-        for objective in Objective.objects.exclude(project=self):
-            ProjectObjective.objects.create(project=self, objective=objective)
+        from .levels import refresh_quality_indicators  # avoids circular import
+        from .matrix import propagate_projects
 
-            # and propagate the Conditions to the ProjectObjective
-            for condition in Condition.objects.filter(objective=objective):
-                ProjectObjectiveCondition.objects.get_or_create(
-                    project=self, objective=objective, condition=condition
-                )
+        with transaction.atomic():
+            super().save(*args, **kwargs)
 
-        # make sure there's a QI object for this Project for each WorkCycle
-        for work_cycle in WorkCycle.objects.all():
-            QI.objects.get_or_create(workcycle=work_cycle, project=self)
+            # when a new Project is added propagate it to all existing Objectives, Conditions,
+            # WorkCycles and Levels
+            propagate_projects([self.pk])
 
-            # make sure there is a Commitment for each WorkCycle/Level/Objective for the Project
-            for objective in Objective.objects.filter(project=self):
-                for level in Level.objects.all():
-                    l = Commitment.objects.get_or_create(
-                        work_cycle=work_cycle,
-                        project=self,
-                        objective=objective,
-                        level=level,
-                    )
+            # the instance's current_qi may be stale, so don't trust what was just saved
+            refresh_quality_indicators([self.pk])
+            self.refresh_from_db(fields=["current_qi"])
 
     def get_absolute_url(self):
         return reverse("projects:project", kwargs={"id": self.id})
@@ -136,8 +124,16 @@ class ProjectObjective(models.Model):
         return " > ".join((self.project.name, self.objective.name))
 
     def save(self, *args, **kwargs):
+        # avoids circular import
+        from .levels import refresh_commitments_met, refresh_quality_indicators
+        from .summary import refresh_summaries
+
         self.level_achieved = self.achieved_level
-        super().save(*args, **kwargs)
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+            refresh_commitments_met([self.project_id], [self.objective_id])
+            refresh_quality_indicators([self.project_id])
+            refresh_summaries([self.project_id])
 
     @cached_property
     def achieved_level(self):
@@ -150,7 +146,9 @@ class ProjectObjective(models.Model):
                     "condition__projectobjectivecondition",
                     filter=Q(
                         condition__projectobjectivecondition__project=self.project,
-                        condition__projectobjectivecondition__status__in=["", "CA"],
+                        condition__projectobjectivecondition__status__in=(
+                            ProjectObjectiveCondition.UNDONE_STATUSES
+                        ),
                     ),
                 )
             )
@@ -181,9 +179,6 @@ class ProjectObjective(models.Model):
             project=self.project, objective=self.objective
         )
 
-    def commitments(self):
-        return Commitment.objects.filter(project=self.project, objective=self.objective)
-
     class Meta:
         ordering = ["project", "objective"]
         constraints = [
@@ -205,6 +200,9 @@ class ProjectObjectiveCondition(models.Model):
         "": "none",
     }
 
+    # statuses that hold back the level achieved by the ProjectObjective
+    UNDONE_STATUSES = ["", "CA"]
+
     status = models.CharField(
         max_length=2,
         choices=STATUS_CHOICES,
@@ -212,19 +210,26 @@ class ProjectObjectiveCondition(models.Model):
     )
 
     def save(self, *args, **kwargs):
-        super().save(*args, **kwargs)
-        self.projectobjective().save()
+        from .levels import record_status_change  # avoids circular import
+
+        with transaction.atomic():
+            # read the stored status under a lock, so that concurrent toggles of the same
+            # condition can't both adjust the undone counter
+            old_status = (
+                ProjectObjectiveCondition.objects.select_for_update()
+                .filter(pk=self.pk)
+                .order_by()
+                .values_list("status", flat=True)
+                .first()
+            )
+            super().save(*args, **kwargs)
+            record_status_change(self, old_status)
 
     def projectobjective(self):
         return ProjectObjective.objects.get(
             project=self.project, objective=self.objective
         )
 
-    def commitments(self):
-        return Commitment.objects.filter(
-            project=self.project, objective=self.objective, level=self.level()
-        )
-
     def level(self):
         return self.condition.level
 
@@ -244,14 +249,38 @@ class ProjectObjectiveCondition(models.Model):
         ]
 
 
+class ProjectObjectiveLevel(models.Model):
+    # counts the conditions at a level of a project's objective that are not yet done - see
+    # projects.levels
+
+    project = models.ForeignKey(Project, on_delete=models.CASCADE)
+    objective = models.ForeignKey(Objective, on_delete=models.CASCADE)
+    level = models.ForeignKey(Level, on_delete=models.CASCADE)
+    undone_count = models.IntegerField(default=0)
+
+    def __str__(self):
+        return " > ".join((self.project.name, self.objective.name, self.level.name))
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["project", "objective", "level"],
+                name="unique_project_objective_level",
+            )
+        ]
+
+
 class Commitment(models.Model):
-    # records a commitment, to a level of an objective of a project, for a particular work cycle
+    # records a commitment, to a level of an objective of a project, for a particular work cycle;
+    # only commitments that have been made are stored, and a missing row means "not committed"
 
     work_cycle = models.ForeignKey(WorkCycle, on_delete=models.CASCADE)
     project = models.ForeignKey("Project", on_delete=models.CASCADE)
     objective = models.ForeignKey(Objective, on_delete=models.CASCADE)
     level = models.ForeignKey(Level, on_delete=models.CASCADE)
-    committed = models.BooleanField(default=False)
+    committed = models.BooleanField(default=True)
+    # whether the level has been achieved, kept up to date by projects.levels
+    met = models.BooleanField(default=False, editable=False)
 
     def __str__(self):
         return " > ".join(
@@ -268,9 +297,21 @@ class Commitment(models.Model):
             project=self.project, objective=self.objective
         )
 
-    def met(self):
-        if self.projectobjective().achieved_level:
-            return self.projectobjective().achieved_level.value >= self.level.value
+    def save(self, *args, **kwargs):
+        # met if the level achieved by the ProjectObjective is at least as high
+        self.met = Level.objects.filter(
+            pk=self.level_id,
+            value__lte=Subquery(
+                ProjectObjective.objects.filter(
+                    project=self.project_id, objective=self.objective_id
+                ).values("level_achieved__value")
+            ),
+        ).exists()
+        super().save(*args, **kwargs)
+
+    def slug(self):
+        # identifies the commitment on its project's page, whether it is stored or not
+        return f"{self.objective_id}-{self.level_id}-{self.work_cycle_id}"
 
     class Meta:
         ordering = [
@@ -300,6 +341,45 @@ class QI(models.Model):
             )
         )
 
+    def save(self, *args, **kwargs):
+        from .summary import refresh_summaries  # avoids circular import
+
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+            refresh_summaries([self.project_id])
+
     class Meta:
         verbose_name = "Quality indicator"
         ordering = ["project__name", "workcycle"]
+
+
+class ProjectSummary(models.Model):
+    # a project's row on the dashboard, kept up to date by projects.summary so that the project
+    # list can be rendered from a single query
+
+    project = models.OneToOneField(
+        Project, primary_key=True, related_name="summary", on_delete=models.CASCADE
+    )
+    # [objective name, status] for each objective, in objective order
+    statuses = models.JSONField(default=list)
+    # [work cycle id, QI value] for each cycle, in cycle order
+    quality_history = models.JSONField(default=list)
+    updated = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return self.project.name
+
+    class Meta:
+        verbose_name_plural = "Project summaries"
+
+
+class ProjectChange(models.Model):
+    # the latest change to a project's data, kept up to date by projects.changes; its id is the
+    # change's version. The project may since have been deleted, so this isn't a foreign key,
+    # and a change without a project is one that could affect every project, such as to an
+    # objective
+
+    project_id = models.PositiveIntegerField(null=True, db_index=True)
+
+    def __str__(self):
+        return f"{self.project_id} @ {self.id}"
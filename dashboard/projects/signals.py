@@ -0,0 +1,90 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from framework.models import (
+    AgreementStatus,
+    Condition,
+    Level,
+    Objective,
+    ObjectiveGroup,
+    ProjectStatus,
+    Reason,
+    WorkCycle,
+)
+
+from .caching import bump_versions
+from .levels import (
+    rebuild_level_counters,
+    recalculate_levels,
+    refresh_commitments_met,
+    refresh_quality_indicators,
+)
+from .models import (
+    Commitment,
+    Project,
+    ProjectGroup,
+    ProjectObjective,
+    ProjectObjectiveCondition,
+    QI,
+)
+from .summary import refresh_summaries
+
+# the models displayed on the pages, either as part of a single project or across projects;
+# changes made with bulk queries, which send no signals, bump the versions themselves
+PROJECT_MODELS = [Project, ProjectObjective, QI, Commitment]
+FRAMEWORK_MODELS = [
+    Objective,
+    WorkCycle,
+    Condition,
+    Level,
+    Reason,
+    ProjectGroup,
+    ObjectiveGroup,
+    AgreementStatus,
+    ProjectStatus,
+]
+
+
+@receiver(post_delete, sender=Condition)
+def condition_deleted(sender, instance, **kwargs):
+    # the Condition's ProjectObjectiveConditions have been deleted with it, so recount what's
+    # left of its Objective
+    rebuild_level_counters(objective_ids=[instance.objective_id])
+    recalculate_levels(objective_ids=[instance.objective_id])
+
+
+@receiver(post_delete, sender=Level)
+@receiver(post_delete, sender=Objective)
+def level_or_objective_deleted(sender, instance, **kwargs):
+    # levels achieved may have been cleared, and objectives removed from every project
+    refresh_commitments_met()
+    refresh_quality_indicators()
+    refresh_summaries()
+
+
+@receiver(post_delete, sender=Reason)
+@receiver(post_delete, sender=WorkCycle)
+def reason_or_work_cycle_deleted(sender, instance, **kwargs):
+    # unstarted reasons may have been cleared, and QIs removed from every project
+    refresh_summaries()
+
+
+def project_model_changed(sender, instance, **kwargs):
+    bump_versions([instance.pk if sender is Project else instance.project_id])
+
+
+def framework_model_changed(sender, **kwargs):
+    bump_versions()
+
+
+for model in PROJECT_MODELS:
+    post_save.connect(project_model_changed, sender=model)
+post_save.connect(project_model_changed, sender=ProjectObjectiveCondition)
+# A receiver for deletions would stop a model's rows from being deleted in bulk along with
+# their project, cycle or objective, so only the deletion of a project itself is received:
+# the rest are deleted with it, with something in the framework, or by the admin, which bumps
+# the versions itself.
+post_delete.connect(project_model_changed, sender=Project)
+for model in FRAMEWORK_MODELS:
+    post_save.connect(framework_model_changed, sender=model)
+    post_delete.connect(framework_model_changed, sender=model)
@@ -0,0 +1,65 @@
+"""
+Maintenance of ProjectSummary, the read model behind the project list.
+
+Each project's summary holds what its row on the dashboard shows from other tables: the status
+of each objective, in objective order, and its QI history. The write paths that change any of
+those call refresh_summaries() for the projects concerned, in the same transaction, so the list
+can be rendered from a single query.
+"""
+
+from .caching import bump_versions
+from .models import Project, ProjectObjective, ProjectSummary, QI
+
+
+def refresh_summaries(project_ids=None):
+    """Rebuild the summaries of the given projects (default: all).
+
+    This is one query per source table and a single upsert, however many projects there are.
+    """
+    projects = Project.objects.order_by()
+    projectobjectives = ProjectObjective.objects.order_by("project_id", "objective")
+    qis = QI.objects.order_by("project_id", "workcycle")
+    if project_ids is not None:
+        projects = projects.filter(id__in=project_ids)
+        projectobjectives = projectobjectives.filter(project_id__in=project_ids)
+        qis = qis.filter(project_id__in=project_ids)
+
+    summaries = {
+        project_id: ProjectSummary(
+            project_id=project_id, statuses=[], quality_history=[]
+        )
+        for project_id in projects.values_list("id", flat=True)
+    }
+    rows = projectobjectives.values_list(
+        "project_id",
+        "objective__name",
+        "level_achieved__name",
+        "unstarted_reason__name",
+    )
+    for project_id, objective_name, level_name, reason_name in rows:
+        if project_id in summaries:
+            summaries[project_id].statuses.append(
+                [objective_name, level_name or reason_name]
+            )
+    rows = qis.values_list("project_id", "workcycle_id", "value")
+    for project_id, workcycle_id, value in rows:
+        if project_id in summaries:
+            summaries[project_id].quality_history.append([workcycle_id, value])
+
+    ProjectSummary.objects.bulk_create(
+        summaries.values(),
+        update_conflicts=True,
+        unique_fields=["project"],
+        update_fields=["statuses", "quality_history", "updated"],
+    )
+    bump_versions(project_ids)
+
+
+def refresh_missing_summaries():
+    """Build the summaries of the projects that have none, such as those created without save()
+    (for example, by a fixture)."""
+    missing = list(
+        Project.objects.filter(summary__isnull=True).values_list("id", flat=True)
+    )
+    if missing:
+        refresh_summaries(missing)
@@ -1,16 +1,24 @@
 from django import template
-from projects.models import Commitment
+from projects.detail import CommitmentIndex
 
 register = template.Library()
 
 
-@register.simple_tag
-def work_cycle_commitment(work_cycle, project, objective, level):
-    return Commitment.objects.get(
-        work_cycle=work_cycle, project=project, objective=objective, level=level
-    ).committed
+def commitment_index(context):
+    """Return the CommitmentIndex for the current request, creating it if need be."""
+    request = context.get("request")
+    if request is not None:
+        if not hasattr(request, "commitment_index"):
+            request.commitment_index = CommitmentIndex()
+        return request.commitment_index
+    # without a request, the index lasts as long as the template is being rendered
+    return context.render_context.setdefault("commitment_index", CommitmentIndex())
 
 
-@register.simple_tag
-def pack(*args):
-    return zip(*args)
+@register.simple_tag(takes_context=True)
+def work_cycle_commitment(context, work_cycle, project, objective, level):
+    # only commitments that have been made are stored, and they're looked up in an index
+    # shared by the whole request rather than queried for each cell
+    return commitment_index(context).is_committed(
+        *(getattr(value, "pk", value) for value in (project, objective, level, work_cycle))
+    )
@@ -0,0 +1,158 @@
+import json
+from io import StringIO
+
+import pytest
+from django.core.management import call_command
+
+from framework.models import ObjectiveGroup, Objective, Level, Condition, WorkCycle
+from projects.matrix import reconcile
+from projects.models import (
+    Commitment,
+    Project,
+    ProjectObjective,
+    ProjectObjectiveCondition,
+    QI,
+)
+
+
+@pytest.fixture
+def objective():
+    return Objective.objects.create(
+        name="test_objective",
+        group=ObjectiveGroup.objects.create(name="test_objective_group"),
+        weight=1,
+    )
+
+
+@pytest.fixture
+def level():
+    return Level.objects.create(name="test_level", value=1)
+
+
+@pytest.fixture
+def condition(objective, level):
+    return Condition.objects.create(
+        name="test_condition", objective=objective, level=level
+    )
+
+
+@pytest.fixture
+def project(objective, condition):
+    return Project.objects.create(name="test_project")
+
+
+@pytest.mark.django_db
+def test_recalculate_levels(project, objective, level, condition):
+    # the condition is met, but save() hasn't been called so level_achieved is out of date
+    ProjectObjectiveCondition.objects.filter(project=project).update(status="DO")
+
+    out = StringIO()
+    call_command("recalculate_levels", stdout=out)
+
+    assert ProjectObjective.objects.get(project=project).level_achieved == level
+    assert out.getvalue().startswith("Recalculated 1 objective statuses: 1 changed in ")
+
+
+@pytest.fixture
+def damaged_matrix(project, objective, level, condition):
+    # changes that bypass save(), as raw SQL or a fixture would
+    work_cycle = WorkCycle.objects.create(name="test_cycle", timestamp="2026-01-01")
+    other = Objective.objects.create(name="other_objective", weight=1)
+    ProjectObjectiveCondition.objects.filter(project=project).update(status="DO")
+    Condition.objects.filter(pk=condition.pk).update(objective=other)
+    QI.objects.filter(project=project).delete()
+    QI.objects.bulk_create([QI(project=project, workcycle=work_cycle)] * 2)
+    Commitment.objects.create(
+        project=project, objective=objective, level=level, work_cycle=work_cycle
+    )
+    Commitment.objects.create(
+        project=project,
+        objective=other,
+        level=level,
+        work_cycle=work_cycle,
+        committed=False,
+    )
+    ProjectObjective.objects.filter(objective=other).delete()
+    return project
+
+
+@pytest.mark.django_db
+def test_reconcile_matrix_dry_run(damaged_matrix):
+    out = StringIO()
+    call_command("reconcile_matrix", "--dry-run", stdout=out)
+
+    assert out.getvalue().splitlines()[:4] == [
+        "ProjectObjective: 1 missing, 0 orphaned",
+        "ProjectObjectiveCondition: 0 missing, 0 orphaned, 1 misfiled",
+        "QI: 0 missing, 1 orphaned",
+        "Commitment: 0 missing, 2 orphaned",
+    ]
+    assert not ProjectObjective.objects.filter(objective__name="other_objective")
+    assert QI.objects.count() == 2
+
+
+@pytest.mark.django_db
+def test_reconcile_matrix(damaged_matrix, condition, level):
+    call_command("reconcile_matrix", stdout=StringIO())
+
+    other = Objective.objects.get(name="other_objective")
+    assert ProjectObjective.objects.filter(project=damaged_matrix).count() == 2
+    # the misfiled condition keeps its status, and counts towards its new objective
+    poc = ProjectObjectiveCondition.objects.get(condition=condition)
+    assert (poc.objective, poc.status) == (other, "DO")
+    assert ProjectObjective.objects.get(objective=other).level_achieved == level
+    assert QI.objects.count() == 1
+    assert not Commitment.objects.exists()
+
+    # nothing is left to fix
+    assert not any(
+        count for counts in reconcile().values() for count in counts.values()
+    )
+
+
+@pytest.mark.django_db
+def test_export_projects(project, objective, level, condition):
+    ProjectObjectiveCondition.objects.filter(project=project).update(status="DO")
+    ProjectObjective.objects.get(project=project).save()
+
+    out = StringIO()
+    call_command("export_projects", "statuses", "--format", "ndjson", stdout=out)
+
+    assert [json.loads(line) for line in out.getvalue().splitlines()] == [
+        {
+            "id": project.id,
+            "project": "test_project",
+            "group": None,
+            "test_objective": "test_level",
+        }
+    ]
+
+
+@pytest.mark.django_db
+def test_export_projects_to_a_file(project, tmp_path):
+    WorkCycle.objects.create(name="test_cycle", timestamp="2026-01-01")
+    output = tmp_path / "qi.csv"
+
+    call_command("export_projects", "quality_indicators", "--output", str(output))
+
+    assert output.read_text().splitlines() == [
+        "id,project,group,current,test_cycle",
+        f"{project.id},test_project,,0,0",
+    ]
+
+
+@pytest.mark.django_db
+def test_reconcile_matrix_recalculates_recreated_rows(
+    project, objective, level, condition
+):
+    ProjectObjectiveCondition.objects.filter(project=project).update(status="DO")
+    ProjectObjective.objects.get(project=project).save()
+    # changes that bypass save(), which leave the QI out of date
+    ProjectObjective.objects.filter(project=project).delete()
+    Project.objects.filter(pk=project.pk).update(current_qi=0)
+
+    call_command("reconcile_matrix", stdout=StringIO())
+
+    assert ProjectObjective.objects.get(project=project).level_achieved == level
+    project.refresh_from_db()
+    assert project.current_qi == 1
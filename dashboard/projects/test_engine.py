@@ -0,0 +1,109 @@
+import pytest
+
+from framework.models import ObjectiveGroup, Objective, Level, Condition
+from projects.engine import Snapshot
+from projects.levels import rebuild_level_counters, recalculate_all_levels
+from projects.models import (
+    Project,
+    ProjectObjective,
+    ProjectObjectiveCondition,
+    ProjectObjectiveLevel,
+)
+
+
+@pytest.fixture
+def framework():
+    # three objectives with different weights, and conditions spread over three levels
+    group = ObjectiveGroup.objects.create(name="test_objective_group")
+    levels = [
+        Level.objects.create(name=f"level_{value}", value=value) for value in (1, 4, 6)
+    ]
+    for i, weight in enumerate((1, 3, 5)):
+        objective = Objective.objects.create(
+            name=f"objective_{i}", group=group, weight=weight
+        )
+        for level in levels[: i + 1]:
+            for j in range(2):
+                Condition.objects.create(
+                    name=f"condition_{i}_{level.value}_{j}",
+                    objective=objective,
+                    level=level,
+                )
+    return levels
+
+
+@pytest.fixture
+def projects(framework):
+    # give each project a different mix of statuses
+    projects = [Project.objects.create(name=f"project_{i}") for i in range(4)]
+    statuses = ["DO", "NA", "CA", "", "DO"]
+    for i, poc in enumerate(ProjectObjectiveCondition.objects.order_by("id")):
+        poc.status = statuses[(i + poc.project_id) % len(statuses)] if i % 3 else "DO"
+        poc.save()
+    return projects
+
+
+@pytest.mark.django_db
+def test_snapshot_matches_orm(projects):
+    snapshot = Snapshot.load()
+
+    achieved_levels = snapshot.achieved_levels()
+    assert len(achieved_levels) == ProjectObjective.objects.count()
+    for projectobjective in ProjectObjective.objects.all():
+        expected = projectobjective.achieved_level
+        assert achieved_levels[
+            (projectobjective.project_id, projectobjective.objective_id)
+        ] == (expected.id if expected else None)
+
+    quality_indicators = snapshot.quality_indicators()
+    for project in projects:
+        assert quality_indicators[project.id] == project.quality_indicator
+    assert any(quality_indicators.values())
+
+
+@pytest.mark.django_db
+def test_snapshot_what_if(projects, framework):
+    project = projects[0]
+    objective = Objective.objects.get(name="objective_0")
+    snapshot = Snapshot.load()
+
+    # with every condition of objective_0 done, the project reaches level_1
+    statuses = {
+        (project.id, condition.id): "DO"
+        for condition in Condition.objects.filter(objective=objective)
+    }
+    changed = snapshot.with_changes(
+        statuses=statuses, level_values={framework[0].id: 2}, weights={objective.id: 10}
+    )
+    levels = changed.achieved_levels()
+    assert levels[(project.id, objective.id)] == framework[0].id
+    assert changed.quality_indicators(levels)[project.id] >= 2 * 10
+
+    # the database and the original snapshot are untouched
+    assert Snapshot.load() == snapshot
+
+
+@pytest.mark.django_db
+def test_recalculate_all_levels_matches_orm(projects):
+    # knock every stored level and counter out of date, behind the maintenance's back
+    ProjectObjective.objects.update(level_achieved=None)
+    Project.objects.update(current_qi=0)
+    ProjectObjectiveLevel.objects.all().delete()
+
+    recalculate_all_levels()
+
+    for projectobjective in ProjectObjective.objects.all():
+        assert projectobjective.level_achieved == projectobjective.achieved_level
+    for project in Project.objects.all():
+        assert project.current_qi == project.quality_indicator
+    recalculated = set(
+        ProjectObjectiveLevel.objects.values_list(
+            "project_id", "objective_id", "level_id", "undone_count"
+        )
+    )
+    rebuild_level_counters()
+    assert recalculated == set(
+        ProjectObjectiveLevel.objects.values_list(
+            "project_id", "objective_id", "level_id", "undone_count"
+        )
+    )
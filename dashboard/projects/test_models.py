@@ -1,13 +1,25 @@
+from datetime import date
+
 import pytest
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 from django.contrib.auth.models import User, Permission
 
-from framework.models import ObjectiveGroup, Objective, Level, Condition
+from framework.models import ObjectiveGroup, Objective, Level, Condition, WorkCycle
 from projects.models import (
+    Commitment,
     Project,
+    ProjectChange,
     ProjectObjective,
     ProjectObjectiveCondition,
+    ProjectObjectiveLevel,
+    QI,
 )
+from projects.caching import data_version
+from projects.changes import current_versions, record_changes
+from projects.commitments import toggle_commitment
+from projects.levels import apply_quality_indicators
 
 
 @pytest.fixture
@@ -238,3 +250,416 @@ def test_project_detail_anchor_navigation(
     response_with_anchor = client.get(anchor_url)
     assert response_with_anchor.status_code == 200
     assert f'id="{expected_id}"' in response_with_anchor.content.decode()
+
+
+def create_framework(objective_group, size):
+    levels = [
+        Level.objects.create(name=f"level_{size}_{i}", value=i) for i in range(size)
+    ]
+    for i in range(size):
+        objective = Objective.objects.create(
+            name=f"objective_{size}_{i}", group=objective_group, weight=1
+        )
+        for level in levels:
+            Condition.objects.create(
+                name=f"condition_{size}_{i}_{level.value}",
+                objective=objective,
+                level=level,
+            )
+    for i in range(size):
+        WorkCycle.objects.create(name=f"cycle_{size}_{i}", timestamp=date(2026, 1, i + 1))
+
+
+@pytest.mark.django_db
+def test_new_project_query_count_is_independent_of_framework_size(objective_group):
+    """Test that adding a Project costs the same number of queries whatever the framework size."""
+
+    create_framework(objective_group, 1)
+    with CaptureQueriesContext(connection) as small:
+        Project.objects.create(name="small_project")
+
+    create_framework(objective_group, 4)
+    with CaptureQueriesContext(connection) as large:
+        project = Project.objects.create(name="large_project")
+
+    assert len(large) == len(small)
+
+    # 5 objectives, 1 + 4 * 4 conditions, 5 cycles, 5 levels
+    assert project.projectobjective_set.count() == 5
+    assert project.projectobjectivecondition_set.count() == 17
+    assert project.qi_set.count() == 5
+    assert not project.commitment_set.exists()
+
+
+@pytest.mark.django_db
+def test_saving_project_again_creates_no_rows(project, objective, condition1):
+    """Test that saving an existing Project doesn't duplicate its rows."""
+
+    project.save()
+    project.save()
+
+    assert project.projectobjective_set.count() == 1
+    assert project.projectobjectivecondition_set.count() == 1
+
+
+@pytest.mark.django_db
+def test_editing_an_objective_leaves_its_counters_alone(project, objective, condition1):
+    """Test that saving an Objective whose rows exist doesn't rebuild its counters."""
+
+    counters = list(ProjectObjectiveLevel.objects.values_list("id", "undone_count"))
+
+    objective.description = "edited"
+    objective.save()
+
+    assert project.projectobjective_set.count() == 1
+    assert project.projectobjectivecondition_set.count() == 1
+    # the rows would have been deleted and created again, with new ids
+    assert list(ProjectObjectiveLevel.objects.values_list("id", "undone_count")) == counters
+
+
+@pytest.mark.django_db
+def test_condition_status_change_updates_level_achieved(
+    project, objective, level1, level2, condition1, condition2
+):
+    """Test that saving a ProjectObjectiveCondition keeps level_achieved up to date."""
+
+    poc1 = ProjectObjectiveCondition.objects.get(project=project, condition=condition1)
+    poc2 = ProjectObjectiveCondition.objects.get(project=project, condition=condition2)
+    po = ProjectObjective.objects.get(project=project, objective=objective)
+
+    poc1.status = "DO"
+    poc1.save()
+    po.refresh_from_db()
+    assert po.level_achieved == level1
+
+    poc2.status = "NA"
+    poc2.save()
+    po.refresh_from_db()
+    assert po.level_achieved == level2
+
+    # moving between two undone statuses changes nothing
+    poc1.status = "CA"
+    poc1.save()
+    poc1.status = ""
+    poc1.save()
+    po.refresh_from_db()
+    assert po.level_achieved is None
+    assert ProjectObjectiveLevel.objects.get(project=project, level=level1).undone_count == 1
+
+
+@pytest.mark.django_db
+def test_condition_status_change_query_count_is_independent_of_conditions(
+    django_assert_max_num_queries, project, objective, level1, level2, condition1
+):
+    """Test that toggling a condition doesn't re-aggregate the objective's conditions."""
+
+    for i in range(10):
+        Condition.objects.create(name=f"condition_{i}", level=level2, objective=objective)
+    poc = ProjectObjectiveCondition.objects.get(project=project, condition=condition1)
+
+    poc.status = "DO"
+    with django_assert_max_num_queries(13):
+        poc.save()
+    assert ProjectObjective.objects.get(project=project).level_achieved == level1
+
+
+@pytest.mark.django_db
+def test_deleting_condition_updates_level_achieved(
+    project, objective, level1, level2, condition1, condition2
+):
+    """Test that deleting the last undone condition of a level lets the objective progress."""
+
+    poc1 = ProjectObjectiveCondition.objects.get(project=project, condition=condition1)
+    poc1.status = "DO"
+    poc1.save()
+
+    condition2.delete()
+
+    po = ProjectObjective.objects.get(project=project, objective=objective)
+    assert po.level_achieved == level1
+    assert not ProjectObjectiveLevel.objects.filter(level=level2).exists()
+
+
+@pytest.mark.django_db
+def test_current_qi_is_maintained(project, objective, level1, level2, condition1):
+    """Test that Project.current_qi follows levels, level values and objective weights."""
+
+    poc = ProjectObjectiveCondition.objects.get(project=project, condition=condition1)
+    poc.status = "DO"
+    poc.save()
+    project.refresh_from_db()
+    assert project.current_qi == project.quality_indicator == 1
+
+    objective.weight = 3
+    objective.save()
+    project.refresh_from_db()
+    assert project.current_qi == project.quality_indicator == 3
+
+    level1.value = 5
+    level1.save()
+    project.refresh_from_db()
+    assert project.current_qi == project.quality_indicator == 15
+
+    poc.status = ""
+    poc.save()
+    project.refresh_from_db()
+    assert project.current_qi == project.quality_indicator == 0
+
+
+@pytest.mark.django_db
+def test_project_summary_is_maintained(project, objective, level1, condition1):
+    """Test that the summary follows statuses, level names, objective order and QIs."""
+
+    def summary():
+        project.summary.refresh_from_db()
+        return project.summary.statuses, project.summary.quality_history
+
+    assert summary() == ([["test_objective", None]], [])
+
+    poc = ProjectObjectiveCondition.objects.get(project=project, condition=condition1)
+    poc.status = "DO"
+    poc.save()
+    assert summary()[0] == [["test_objective", "level_1"]]
+
+    level1.name = "Begun"
+    level1.save()
+    Objective.objects.create(name="another_objective", weight=1)
+    assert summary()[0] == [["another_objective", None], ["test_objective", "Begun"]]
+
+    work_cycle = WorkCycle.objects.create(name="cycle", timestamp=date(2026, 1, 1))
+    assert summary()[1] == [[work_cycle.id, 0]]
+    apply_quality_indicators([work_cycle.id])
+    assert summary()[1] == [[work_cycle.id, 1]]
+    assert QI.objects.get(project=project).value == 1
+
+
+@pytest.mark.django_db
+def test_commitment_met_is_maintained(
+    project, objective, level1, level2, condition1, condition2
+):
+    """Test that Commitment.met follows levels achieved and level values."""
+
+    work_cycle = WorkCycle.objects.create(name="cycle", timestamp=date(2026, 1, 1))
+    commitments = [
+        Commitment.objects.create(
+            project=project, objective=objective, level=level, work_cycle=work_cycle
+        )
+        for level in (level1, level2)
+    ]
+
+    def met():
+        return [
+            Commitment.objects.get(pk=commitment.pk).met for commitment in commitments
+        ]
+
+    assert met() == [False, False]
+
+    poc = ProjectObjectiveCondition.objects.get(project=project, condition=condition1)
+    poc.status = "DO"
+    poc.save()
+    assert met() == [True, False]
+    assert Commitment.objects.filter(work_cycle=work_cycle, met=True).count() == 1
+
+    # level 2 now comes first, and holds back level 1
+    level2.value = 0
+    level2.save()
+    assert met() == [False, False]
+
+    level2.value = 2
+    level2.save()
+    commitments[0].delete()
+    commitments[0] = Commitment.objects.create(
+        project=project, objective=objective, level=level1, work_cycle=work_cycle
+    )
+    assert met() == [True, False]
+
+
+@pytest.mark.django_db
+def test_toggle_commitment_writes_without_reading_the_commitment_first(
+    django_assert_max_num_queries, project, objective, level1, level2, condition1
+):
+    """Test that a toggle locks its ProjectObjective, then writes without reading the
+    commitment first, and stores whether it is met."""
+
+    work_cycle = WorkCycle.objects.create(name="cycle", timestamp=date(2026, 1, 1))
+    poc = ProjectObjectiveCondition.objects.get(project=project, condition=condition1)
+    poc.status = "DO"
+    poc.save()
+    key = [project.id, objective.id, level1.id, work_cycle.id]
+
+    # the lock, a DELETE that finds nothing, the level, then the UPDATE that finds nothing
+    # and the INSERT, within a savepoint
+    with django_assert_max_num_queries(7):
+        assert toggle_commitment(*key) is True
+    assert Commitment.objects.get(level=level1).met is True
+
+    # the lock, then the DELETE
+    with django_assert_max_num_queries(4):
+        assert toggle_commitment(*key) is False
+    assert not Commitment.objects.exists()
+
+    # a commitment left over with committed False doesn't swallow the toggle
+    Commitment.objects.bulk_create(
+        [
+            Commitment(
+                project=project,
+                objective=objective,
+                level=level1,
+                work_cycle=work_cycle,
+                committed=False,
+            )
+        ]
+    )
+    assert toggle_commitment(*key) is True
+    assert Commitment.objects.get(level=level1).committed is True
+    assert toggle_commitment(*key) is False
+    assert not Commitment.objects.exists()
+
+    # the objective has no conditions at level 2
+    assert toggle_commitment(project.id, objective.id, level2.id, work_cycle.id) is None
+    assert not Commitment.objects.exists()
+
+
+@pytest.mark.django_db
+def test_a_transaction_is_one_change(
+    django_capture_on_commit_callbacks, project, objective, level1, condition1
+):
+    """Test that everything a transaction changes is recorded under a single version."""
+
+    with django_capture_on_commit_callbacks(execute=True):
+        project.save()
+    version, _ = current_versions()
+
+    poc = ProjectObjectiveCondition.objects.get(project=project, condition=condition1)
+    with django_capture_on_commit_callbacks(execute=True) as callbacks:
+        poc.status = "DO"
+        poc.save()
+
+    # the condition, the level achieved, the QI and the summary each recorded the change
+    assert len(callbacks) > 1
+    change = ProjectChange.objects.get(project_id=project.id)
+    assert change.id > version
+    assert current_versions()[0] == change.id
+
+
+@pytest.mark.django_db
+def test_changes_rolled_back_are_not_recorded(django_capture_on_commit_callbacks):
+    with django_capture_on_commit_callbacks(execute=True):
+        with pytest.raises(RuntimeError):
+            with transaction.atomic():
+                record_changes([1])
+                raise RuntimeError
+        record_changes([2])
+
+    assert list(ProjectChange.objects.values_list("project_id", flat=True)) == [2]
+
+
+@pytest.mark.django_db
+def test_deleting_a_project_deletes_its_rows_in_bulk(objective, condition1):
+    """Test that a project's rows are deleted without being loaded, however many there are."""
+
+    def delete(project):
+        with CaptureQueriesContext(connection) as queries:
+            project.delete()
+        return len(queries)
+
+    few = delete(Project.objects.create(name="few"))
+
+    for i in range(4):
+        WorkCycle.objects.create(name=f"cycle_{i}", timestamp=date(2026, 1, i + 1))
+    project = Project.objects.create(name="many")
+    Commitment.objects.create(
+        project=project,
+        objective=objective,
+        level=condition1.level,
+        work_cycle=WorkCycle.objects.first(),
+    )
+
+    assert delete(project) == few
+
+
+@pytest.mark.django_db
+def test_deleting_rows_in_the_admin_bumps_the_versions(
+    admin_client, objective, project
+):
+    """Test that the rows of a project deleted in the admin invalidate its cached pages."""
+
+    def deleted_in_admin(post):
+        version = data_version()
+        post()
+        return data_version() > version
+
+    projectobjective = ProjectObjective.objects.get(project=project)
+    assert deleted_in_admin(
+        lambda: admin_client.post(
+            reverse(
+                "admin:projects_projectobjective_delete", args=[projectobjective.id]
+            ),
+            {"post": "yes"},
+        )
+    )
+    work_cycle = WorkCycle.objects.create(name="cycle", timestamp=date(2026, 1, 1))
+    qi = QI.objects.get(project=project, workcycle=work_cycle)
+    assert deleted_in_admin(
+        lambda: admin_client.post(
+            reverse("admin:projects_qi_changelist"),
+            {"action": "delete_selected", "_selected_action": [qi.id], "post": "yes"},
+        )
+    )
+    assert not ProjectObjective.objects.exists() and not QI.objects.exists()
+
+
+@pytest.mark.django_db
+def test_deleting_rows_in_the_admin_refreshes_the_summary(
+    admin_client, project, objective, level1, condition1
+):
+    """Test that the QI and summary of a project follow its rows deleted in the admin."""
+
+    poc = ProjectObjectiveCondition.objects.get(project=project, condition=condition1)
+    poc.status = "DO"
+    poc.save()
+    work_cycle = WorkCycle.objects.create(name="cycle", timestamp=date(2026, 1, 1))
+    qi = QI.objects.get(project=project, workcycle=work_cycle)
+    qi.value = 5
+    qi.save()
+    project.refresh_from_db()
+    assert project.current_qi == 1
+    assert project.summary.quality_history == [[work_cycle.id, 5]]
+
+    admin_client.post(
+        reverse("admin:projects_qi_changelist"),
+        {"action": "delete_selected", "_selected_action": [qi.id], "post": "yes"},
+    )
+    projectobjective = ProjectObjective.objects.get(project=project)
+    admin_client.post(
+        reverse("admin:projects_projectobjective_delete", args=[projectobjective.id]),
+        {"post": "yes"},
+    )
+
+    project.refresh_from_db()
+    project.summary.refresh_from_db()
+    assert project.current_qi == 0
+    assert project.summary.quality_history == []
+    assert project.summary.statuses == []
+
+
+@pytest.mark.django_db
+def test_deleting_a_condition_in_the_admin_recalculates_the_level(
+    admin_client, project, objective, level1, level2, condition1, condition2
+):
+    """Test that deleting a ProjectObjectiveCondition in the admin updates the counters."""
+
+    poc1 = ProjectObjectiveCondition.objects.get(project=project, condition=condition1)
+    poc2 = ProjectObjectiveCondition.objects.get(project=project, condition=condition2)
+    poc2.status = "DO"
+    poc2.save()
+
+    admin_client.post(
+        reverse("admin:projects_projectobjectivecondition_delete", args=[poc1.id]),
+        {"post": "yes"},
+    )
+
+    counters = ProjectObjectiveLevel.objects.order_by("level__value")
+    assert list(counters.values_list("level", "undone_count")) == [(level2.id, 0)]
+    po = ProjectObjective.objects.get(project=project, objective=objective)
+    assert po.level_achieved == po.achieved_level == level2
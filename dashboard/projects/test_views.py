@@ -1,7 +1,14 @@
+import json
+
 import pytest
 from urllib.parse import parse_qs, urlparse
 
-from django.test import override_settings
+from asgiref.sync import async_to_sync, sync_to_async
+from django.contrib.auth.models import Permission, User
+from django.db import connection
+from django.template import Context, Template
+from django.test import AsyncClient, RequestFactory, override_settings
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 
 from framework.models import (
@@ -12,11 +19,17 @@ from framework.models import (
     Reason,
     WorkCycle,
 )
+from projects.caching import permission_fingerprint
+from projects.changes import current_versions
+from projects.levels import refresh_quality_indicators
+from projects.live import LocalBroker, RedisBroker, SharedBroker, event, stream
+from projects.summary import refresh_summaries
 from projects.models import (
     Commitment,
     Project,
     ProjectObjective,
     ProjectObjectiveCondition,
+    ProjectObjectiveLevel,
     QI,
 )
 
@@ -71,12 +84,27 @@ def project_objective_condition(project, objective, condition):
 
 
 @pytest.fixture
-def commitment(project, objective, level, work_cycle):
-    return Commitment.objects.get(
+def commitment(project, objective, level, work_cycle, condition):
+    # not yet made, so not stored; it can be made because the objective has a condition at
+    # the level
+    return Commitment(
         project=project,
         objective=objective,
         level=level,
         work_cycle=work_cycle,
+        committed=False,
+    )
+
+
+def toggle_commitment_url(commitment):
+    return reverse(
+        "projects:action_toggle_commitment",
+        args=[
+            commitment.project_id,
+            commitment.objective_id,
+            commitment.level_id,
+            commitment.work_cycle_id,
+        ],
     )
 
 
@@ -163,7 +191,7 @@ def test_project_basic_form_save_allows_user_with_permission(
 def test_action_toggle_commitment_denies_user_without_permission(
     client, user_without_permissions, commitment
 ):
-    url = reverse("projects:action_toggle_commitment", args=[commitment.id])
+    url = toggle_commitment_url(commitment)
     response = client.put(url)
 
     assert response.status_code == 302
@@ -211,7 +239,7 @@ def test_action_select_reason_denies_user_without_permission(
 def test_action_toggle_commitment_rejects_non_put_method(
     client, user_can_change_commitment, commitment
 ):
-    url = reverse("projects:action_toggle_commitment", args=[commitment.id])
+    url = toggle_commitment_url(commitment)
     response = client.get(url)
 
     assert response.status_code == 405
@@ -221,15 +249,43 @@ def test_action_toggle_commitment_rejects_non_put_method(
 def test_action_toggle_commitment_allows_authorized_put_and_updates_commitment(
     client, user_can_change_commitment, commitment
 ):
-    assert commitment.committed is False
+    key = dict(
+        project=commitment.project,
+        objective=commitment.objective,
+        level=commitment.level,
+        work_cycle=commitment.work_cycle,
+    )
+    assert not Commitment.objects.filter(**key).exists()
 
-    url = reverse("projects:action_toggle_commitment", args=[commitment.id])
+    url = toggle_commitment_url(commitment)
     response = client.put(url)
 
-    commitment.refresh_from_db()
     assert response.status_code == 200
-    assert commitment.committed is True
+    assert Commitment.objects.get(**key).committed is True
     assert response["HX-Trigger-After-Swap"] == "updateCommitment"
+    # the response is the commitment's cell, showing its new state
+    assert f'id="commitment-{commitment.slug()}"' in response.content.decode()
+    assert "checked" in response.content.decode()
+
+    # toggling again withdraws the commitment, which removes the row
+    response = client.put(url)
+    assert not Commitment.objects.filter(**key).exists()
+    assert "checked" not in response.content.decode()
+
+
+@pytest.mark.django_db
+def test_action_toggle_commitment_rejects_a_commitment_that_cannot_be_made(
+    client, user_can_change_commitment, commitment, objective, level
+):
+    # the objective has no conditions at the level
+    Condition.objects.filter(objective=objective, level=level).delete()
+    response = client.put(toggle_commitment_url(commitment))
+    assert response.status_code == 404
+
+    commitment.work_cycle_id = 0
+    response = client.put(toggle_commitment_url(commitment))
+    assert response.status_code == 404
+    assert not Commitment.objects.exists()
 
 
 @pytest.mark.django_db
@@ -266,7 +322,32 @@ def test_action_toggle_condition_allows_authorized_put_and_updates_status(
     project_objective_condition.refresh_from_db()
     assert response.status_code == 200
     assert project_objective_condition.status == "DO"
-    assert "HX-Trigger-After-Swap" in response
+    # the objective's status and the commitments table are updated in the same response
+    content = response.content.decode()
+    assert content.startswith("<tr")
+    assert 'id="commitment-table"' in content
+    assert "HX-Trigger-After-Swap" not in response
+
+
+@pytest.mark.django_db
+def test_action_toggle_condition_returns_objective_status_out_of_band(
+    client, user_can_change_projectobjectivecondition, project_objective_condition
+):
+    url = (
+        reverse(
+            "projects:action_toggle_condition",
+            args=[project_objective_condition.id],
+        )
+        + "?status=&target=done"
+    )
+    projectobjective = project_objective_condition.projectobjective()
+
+    content = client.put(url).content.decode()
+
+    status_id = f'id="projectobjective_status_{projectobjective.id}"'
+    status_tag = content[content.index(status_id) :].split(">")[0]
+    assert 'class="level"' in status_tag
+    assert 'hx-swap-oob="true"' in status_tag
 
 
 @pytest.mark.django_db
@@ -320,6 +401,9 @@ def test_project_list_renders_qi_history_current_qi_and_levels(
     ProjectObjective.objects.filter(id=project_objective.id).update(
         level_achieved=level_for_display
     )
+    # update() bypasses the maintenance of the stored QI and summary
+    refresh_quality_indicators([project.id])
+    refresh_summaries([project.id])
 
     response = client.get(reverse("projects:project_list"))
     content = response.content.decode()
@@ -403,3 +487,770 @@ def test_force_login_project_detail_with_user(
     url = reverse("projects:project", kwargs={"id": project.id})
     response = client.get(url)
     assert response.status_code == 200
+
+
+@pytest.mark.django_db
+@override_settings(FORCE_LOGIN=False)
+def test_project_list_query_count_is_independent_of_projects(
+    client, objective, work_cycle
+):
+    # each row is rendered from the project's summary, fetched with the project itself
+    url = reverse("projects:project_list")
+    Project.objects.create(name="project_1")
+    with CaptureQueriesContext(connection) as few:
+        client.get(url)
+
+    for i in range(2, 6):
+        Project.objects.create(name=f"project_{i}")
+    with CaptureQueriesContext(connection) as many:
+        response = client.get(url)
+
+    assert response.status_code == 200
+    assert len(many) == len(few)
+
+
+@pytest.mark.django_db
+@override_settings(FORCE_LOGIN=False)
+def test_project_list_is_cached_until_data_changes(
+    client, django_assert_num_queries, project, project_objective, work_cycle
+):
+    url = reverse("projects:project_list")
+    first = client.get(url)
+
+    with django_assert_num_queries(0):
+        second = client.get(url)
+    assert second.content == first.content
+    assert client.get(url, headers={"If-None-Match": first["ETag"]}).status_code == 304
+
+    project.name = "renamed_project"
+    project.save()
+    assert "renamed_project" in client.get(url).content.decode()
+
+    QI.objects.filter(project=project, workcycle=work_cycle).update(value=42)
+    # update() sends no signal, but the summary refresh bumps the data version
+    refresh_summaries([project.id])
+    assert "<td>42</td>" in client.get(url).content.decode()
+
+
+@pytest.mark.django_db
+def test_project_list_cache_is_keyed_on_permissions(
+    user_without_permissions, user_is_staff
+):
+    fingerprint = permission_fingerprint(user_without_permissions)
+
+    assert permission_fingerprint(user_is_staff) != fingerprint
+    assert permission_fingerprint(user_without_permissions) == fingerprint
+
+
+@pytest.mark.django_db
+def test_project_list_rerenders_only_changed_rows(
+    client, user_can_change_projectobjectivecondition, project_objective_condition
+):
+    Project.objects.create(name="bystander")
+    row_template = "projects/partial_project_list_row.html"
+    url = reverse("projects:project_list")
+
+    response = client.get(url)
+    assert [t.name for t in response.templates].count(row_template) == 2
+    assert '<td class="level">' not in response.content.decode()
+
+    client.put(
+        reverse(
+            "projects:action_toggle_condition",
+            args=[project_objective_condition.id],
+        )
+        + "?status=&target=done"
+    )
+    response = client.get(url)
+
+    assert [t.name for t in response.templates].count(row_template) == 1
+    assert '<td class="level">' in response.content.decode()
+
+
+@pytest.mark.django_db
+@override_settings(FORCE_LOGIN=False)
+def test_project_detail_is_not_modified_until_the_project_changes(
+    client, django_assert_num_queries, project, project_objective_condition
+):
+    url = reverse("projects:project", kwargs={"id": project.id})
+    response = client.get(url)
+    etag = response["ETag"]
+    assert response.status_code == 200
+    assert "Last-Modified" not in response
+
+    with django_assert_num_queries(0):
+        response = client.get(url, headers={"If-None-Match": etag})
+    assert response.status_code == 304
+    # only the ETag, which covers the viewer's permissions, can confirm a copy is current
+    since = "Fri, 01 Jan 2100 00:00:00 GMT"
+    assert client.get(url, headers={"If-Modified-Since": since}).status_code == 200
+
+    project_objective_condition.status = "DO"
+    project_objective_condition.save()
+    response = client.get(url, headers={"If-None-Match": etag})
+    assert response.status_code == 200
+    assert response["ETag"] != etag
+
+
+@pytest.mark.django_db
+@override_settings(FORCE_LOGIN=False)
+def test_status_partials_are_not_modified_until_the_project_changes(
+    client, django_assert_num_queries, project, project_objective, reason
+):
+    urls = [
+        reverse("projects:status_projects_commitment", args=[project.id]),
+        reverse("projects:status_projectobjective", args=[project_objective.id]),
+        reverse(
+            "projects:status_dashboardprojectobjective", args=[project_objective.id]
+        ),
+    ]
+    etags = [client.get(url)["ETag"] for url in urls]
+
+    with django_assert_num_queries(0):
+        for url, etag in zip(urls, etags):
+            assert client.get(url, headers={"If-None-Match": etag}).status_code == 304
+
+    project_objective.unstarted_reason = reason
+    project_objective.save()
+    for url, etag in zip(urls, etags):
+        assert client.get(url, headers={"If-None-Match": etag}).status_code == 200
+
+
+@pytest.mark.django_db
+@override_settings(FORCE_LOGIN=False)
+def test_project_detail_query_count_is_independent_of_objectives(
+    client, project, condition, objective_group, level
+):
+    url = reverse("projects:project", kwargs={"id": project.id})
+    with CaptureQueriesContext(connection) as few:
+        client.get(url)
+
+    second_level = Level.objects.create(name="second_level", value=2)
+    for i in range(3):
+        objective = Objective.objects.create(
+            name=f"objective_{i}", group=objective_group, weight=1
+        )
+        for condition_level in (level, second_level):
+            Condition.objects.create(
+                name=f"condition_{i}_{condition_level.value}",
+                objective=objective,
+                level=condition_level,
+            )
+        Commitment.objects.create(
+            project=project,
+            objective=objective,
+            level=level,
+            work_cycle=WorkCycle.objects.get(),
+        )
+    WorkCycle.objects.create(name="wc-2", timestamp="2026-02-01")
+    with CaptureQueriesContext(connection) as many:
+        response = client.get(url)
+
+    assert response.status_code == 200
+    assert response.content.decode().count('class="level"') == 7
+    assert len(many) == len(few)
+
+
+@pytest.mark.django_db
+def test_work_cycle_commitment_looks_up_a_request_scoped_index(
+    django_assert_num_queries, project, objective, level, work_cycle, condition
+):
+    Commitment.objects.create(
+        project=project, objective=objective, level=level, work_cycle=work_cycle
+    )
+    other_cycle = WorkCycle.objects.create(name="wc-2", timestamp="2026-02-01")
+    template = Template(
+        "{% load project_tags %}{% for work_cycle in work_cycles %}"
+        "{% work_cycle_commitment work_cycle project objective level %} {% endfor %}"
+    )
+    context = {
+        "request": RequestFactory().get("/"),
+        "work_cycles": [work_cycle, other_cycle] * 5,
+        "project": project,
+        "objective": objective,
+        "level": level,
+    }
+
+    with django_assert_num_queries(1):
+        first = template.render(Context(context))
+        second = template.render(Context(context))
+
+    assert first == second == "True False " * 5
+
+
+@pytest.fixture
+def user_can_review(client):
+    user = User.objects.create_user(username="reviewer", password="password")
+    user.user_permissions.add(
+        *Permission.objects.filter(
+            codename__in=[
+                "change_commitment",
+                "change_projectobjective",
+                "change_projectobjectivecondition",
+            ],
+            content_type__app_label="projects",
+        )
+    )
+    client.login(username="reviewer", password="password")
+    return user
+
+
+def apply_changes_url(project):
+    return reverse("projects:action_apply_changes", args=[project.id])
+
+
+@pytest.mark.django_db
+def test_action_apply_changes_applies_every_kind_of_change(
+    client, user_can_review, project, objective, level, condition, commitment, reason
+):
+    other_objective = Objective.objects.create(
+        name="other", group=objective.group, weight=1
+    )
+    poc = ProjectObjectiveCondition.objects.get(project=project, condition=condition)
+    projectobjective = ProjectObjective.objects.get(project=project, objective=objective)
+    other = ProjectObjective.objects.get(project=project, objective=other_objective)
+
+    response = client.post(
+        apply_changes_url(project),
+        {
+            "conditions": [{"id": poc.id, "status": "DO"}],
+            "commitments": [
+                {
+                    "objective": objective.id,
+                    "level": level.id,
+                    "work_cycle": commitment.work_cycle_id,
+                }
+            ],
+            "reasons": [{"projectobjective": other.id, "reason": reason.id}],
+        },
+        content_type="application/json",
+    )
+
+    assert response.status_code == 200
+    projectobjective.refresh_from_db()
+    other.refresh_from_db()
+    assert projectobjective.level_achieved == level
+    assert other.unstarted_reason == reason
+    stored = Commitment.objects.get(project=project, objective=objective, level=level)
+    assert stored.met is True
+    assert Project.objects.get(id=project.id).current_qi == 1
+
+    # every changed fragment comes back out of band
+    content = response.content.decode()
+    assert f'id="condition_{poc.id}"' in content
+    assert f'id="commitment-{commitment.slug()}"' in content
+    assert f'id="projectobjective_status_{projectobjective.id}"' in content
+    assert f'id="projectobjective_status_{other.id}"' in content
+    assert 'id="commitment-table"' in content
+    assert content.count('hx-swap-oob="true"') == 4
+
+
+@pytest.mark.django_db
+def test_action_apply_changes_recalculates_each_objective_once(
+    client, user_can_review, project, objective, level, condition
+):
+    for i in range(10):
+        Condition.objects.create(name=f"condition_{i}", objective=objective, level=level)
+    pocs = list(ProjectObjectiveCondition.objects.filter(project=project))
+    url = apply_changes_url(project)
+
+    def apply(pocs, status):
+        with CaptureQueriesContext(connection) as queries:
+            response = client.post(
+                url,
+                {"conditions": [{"id": poc.id, "status": status} for poc in pocs]},
+                content_type="application/json",
+            )
+        assert response.status_code == 200
+        return len(queries)
+
+    # the level achieved changes in neither batch
+    assert apply(pocs[:1], "CA") == apply(pocs[1:], "CA")
+    apply(pocs, "DO")
+    projectobjective = ProjectObjective.objects.get(project=project, objective=objective)
+    assert projectobjective.level_achieved == level
+
+
+@pytest.mark.django_db
+def test_action_apply_changes_adjusts_the_undone_counters_in_place(
+    client, user_can_review, project, objective, level, condition
+):
+    Condition.objects.create(name="other", objective=objective, level=level)
+    pocs = list(ProjectObjectiveCondition.objects.filter(project=project))
+    counter = ProjectObjectiveLevel.objects.get(project=project, level=level)
+    assert counter.undone_count == 2
+
+    response = client.post(
+        apply_changes_url(project),
+        {"conditions": [{"id": poc.id, "status": "DO"} for poc in pocs]},
+        content_type="application/json",
+    )
+
+    assert response.status_code == 200
+    # the same row, rather than one recounted from scratch
+    assert ProjectObjectiveLevel.objects.get(id=counter.id).undone_count == 0
+    projectobjective = ProjectObjective.objects.get(project=project, objective=objective)
+    assert projectobjective.level_achieved == level
+
+
+@pytest.mark.django_db
+def test_action_apply_changes_changes_nothing_unless_it_can_change_everything(
+    client, user_can_review, project, objective, level, condition, work_cycle
+):
+    other_project = Project.objects.create(name="other", owner="owner", driver="driver")
+    poc = ProjectObjectiveCondition.objects.get(project=project, condition=condition)
+    elsewhere = ProjectObjectiveCondition.objects.get(
+        project=other_project, condition=condition
+    )
+    commitment = {"objective": objective.id, "level": level.id, "work_cycle": work_cycle.id}
+
+    # a condition of another project
+    response = client.post(
+        apply_changes_url(project),
+        {
+            "conditions": [
+                {"id": poc.id, "status": "DO"},
+                {"id": elsewhere.id, "status": "DO"},
+            ],
+            "commitments": [commitment],
+        },
+        content_type="application/json",
+    )
+    assert response.status_code == 404
+
+    # a commitment that can't be made
+    response = client.post(
+        apply_changes_url(project),
+        {
+            "conditions": [{"id": poc.id, "status": "DO"}],
+            "commitments": [commitment | {"work_cycle": 0}],
+        },
+        content_type="application/json",
+    )
+    assert response.status_code == 404
+
+    projectobjective = ProjectObjective.objects.get(project=project, objective=objective)
+    for changes in [
+        {"conditions": [{"id": poc.id, "status": "XX"}]},
+        {"conditions": [{"id": poc.id}]},
+        # a reason is either null or the id of one
+        {"reasons": [{"projectobjective": projectobjective.id, "reason": 0}]},
+        {"reasons": [{"projectobjective": projectobjective.id, "reason": ""}]},
+        "not a batch",
+    ]:
+        response = client.post(
+            apply_changes_url(project), changes, content_type="application/json"
+        )
+        assert response.status_code == 400
+
+    poc.refresh_from_db()
+    assert poc.status == ""
+    assert not Commitment.objects.exists()
+
+
+@pytest.mark.django_db
+def test_action_apply_changes_denies_user_without_permission(
+    client, user_without_permissions, project
+):
+    url = apply_changes_url(project)
+    response = client.post(url, {}, content_type="application/json")
+
+    assert response.status_code == 302
+    assert response.url == f"{reverse('login')}?next={url}"
+
+
+@pytest.mark.django_db
+def test_action_apply_changes_requires_the_permissions_for_each_kind_of_change(
+    client, user_can_change_projectobjectivecondition, project, condition, commitment
+):
+    poc = ProjectObjectiveCondition.objects.get(project=project, condition=condition)
+    response = client.post(
+        apply_changes_url(project),
+        {
+            "conditions": [{"id": poc.id, "status": "DO"}],
+            "commitments": [
+                {
+                    "objective": commitment.objective_id,
+                    "level": commitment.level_id,
+                    "work_cycle": commitment.work_cycle_id,
+                }
+            ],
+        },
+        content_type="application/json",
+    )
+
+    assert response.status_code == 403
+    poc.refresh_from_db()
+    assert poc.status == ""
+
+
+@override_settings(FORCE_LOGIN=False)
+@pytest.mark.django_db
+def test_live_updates_stream_the_changes_of_the_page(
+    django_capture_on_commit_callbacks, project, objective, level, condition
+):
+    with django_capture_on_commit_callbacks(execute=True):
+        other = Project.objects.create(name="other", owner="owner", driver="driver")
+    poc = ProjectObjectiveCondition.objects.get(project=project, condition=condition)
+    version, _ = current_versions()
+
+    def tick(changed):
+        with django_capture_on_commit_callbacks(execute=True):
+            changed.name = f"{changed.name} renamed"
+            changed.save()
+
+    async def receive(project_id=None):
+        params = {"since": version}
+        if project_id is not None:
+            params["project"] = project_id
+        response = await AsyncClient().get(reverse("projects:live_updates"), params)
+        assert response["Content-Type"] == "text/event-stream"
+        events = aiter(response.streaming_content)
+        assert await anext(events) == b": subscribed\n\n"
+
+        # made in the test's own thread, which holds its database connection
+        await sync_to_async(tick)(other)
+        await sync_to_async(tick)(project)
+        event = await anext(events)
+        await events.aclose()
+        return event.decode()
+
+    # the list is sent the first change, the project's page only that of its project
+    for project_id, fragment in [
+        (None, f'id="project-row-{other.id}"'),
+        (project.id, f'id="condition_{poc.id}"'),
+    ]:
+        name, *lines = async_to_sync(receive)(project_id).strip().split("\n")
+        assert name == "event: changes"
+        data = "\n".join(line.removeprefix("data: ") for line in lines)
+        assert fragment in data
+        # the fragments come with the poller, from the version they bring the page to
+        assert 'id="changes-poller"' in data
+        assert f"since={version}" not in data
+
+
+@override_settings(FORCE_LOGIN=False)
+@pytest.mark.django_db
+def test_live_updates_reload_the_page_when_the_framework_changes(
+    django_capture_on_commit_callbacks, objective
+):
+    version, _ = current_versions()
+
+    def tick():
+        with django_capture_on_commit_callbacks(execute=True):
+            objective.name = "renamed"
+            objective.save()
+
+    async def receive():
+        response = await AsyncClient().get(
+            reverse("projects:live_updates"), {"since": version}
+        )
+        events = aiter(response.streaming_content)
+        await anext(events)
+        await sync_to_async(tick)()
+        event = await anext(events)
+        await events.aclose()
+        return event.decode()
+
+    assert async_to_sync(receive)() == "event: refresh\ndata: \n\n"
+
+
+@override_settings(FORCE_LOGIN=False)
+def test_live_updates_need_an_asgi_server(client):
+    # the browser doesn't reconnect after a 204
+    assert client.get(reverse("projects:live_updates")).status_code == 204
+
+
+@override_settings(FORCE_LOGIN=False)
+@pytest.mark.django_db
+def test_live_updates_start_from_the_version_of_each_page(client, project):
+    version, _ = current_versions()
+    pages = {
+        reverse("projects:project_list"): f"?since={version}",
+        reverse("projects:project", args=[project.id]): (
+            f"?since={version}&amp;project={project.id}"
+        ),
+    }
+    live_url = reverse("projects:live_updates")
+    for url, query in pages.items():
+        content = client.get(url).content.decode()
+        assert f'data-url="{live_url}{query}" defer>' in content
+        assert 'hx-trigger="every 60s"' in content
+
+
+async def relay(project_ids):
+    return event("projects", json.dumps(project_ids))
+
+
+def test_live_updates_send_keepalives():
+    async def receive():
+        events = stream(LocalBroker(), relay, keepalive=0.01)
+        received = [await anext(events), await anext(events)]
+        await events.aclose()
+        return received
+
+    assert async_to_sync(receive)() == [": subscribed\n\n", ": keepalive\n\n"]
+
+
+def test_live_updates_go_through_redis():
+    fakeredis = pytest.importorskip("fakeredis")
+    server = fakeredis.FakeServer()
+    broker = RedisBroker(
+        fakeredis.FakeRedis(server=server),
+        fakeredis.FakeAsyncRedis(server=server),
+    )
+
+    async def receive():
+        events = stream(broker, relay)
+        await anext(events)
+        broker.publish("[1]")
+        event = await anext(events)
+        await events.aclose()
+        return event
+
+    assert async_to_sync(receive)() == "event: projects\ndata: [1]\n\n"
+
+
+def test_live_updates_share_a_subscription_per_process():
+    broker = LocalBroker()
+    shared = SharedBroker(broker)
+
+    async def receive():
+        first, second = stream(shared, relay), stream(shared, relay)
+        await anext(first)
+        await anext(second)
+        assert len(broker.subscriptions) == 1
+        shared.publish("[1, null]")
+        received = [await anext(first), await anext(second)]
+        await first.aclose()
+        assert len(broker.subscriptions) == 1
+        await second.aclose()
+        # the last subscriber to leave drops the subscription
+        assert not broker.subscriptions
+        return received
+
+    assert async_to_sync(receive)() == ["event: projects\ndata: [1, null]\n\n"] * 2
+
+
+@override_settings(FORCE_LOGIN=False)
+@pytest.mark.django_db
+def test_status_changes_returns_the_rows_changed_since_a_version(
+    client, django_capture_on_commit_callbacks, project, objective, level, condition
+):
+    with django_capture_on_commit_callbacks(execute=True):
+        other = Project.objects.create(name="other", owner="owner", driver="driver")
+    url = reverse("projects:status_changes")
+    response = client.get(reverse("projects:project_list"))
+    version, _ = current_versions()
+    assert f"{url}?since={version}" in response.content.decode()
+
+    poc = ProjectObjectiveCondition.objects.get(project=project, condition=condition)
+    with django_capture_on_commit_callbacks(execute=True):
+        poc.status = "DO"
+        poc.save()
+    response = client.get(url, {"since": version})
+
+    assert response.status_code == 200
+    content = response.content.decode()
+    assert f'<tr id="project-row-{project.id}"' in content
+    assert f'id="project-row-{other.id}"' not in content
+    # the poller asks again from the new version, when nothing has changed since
+    new_version, _ = current_versions()
+    assert new_version > version
+    assert f"since={new_version}" in content
+    assert client.get(url, {"since": new_version}).status_code == 204
+
+    other_id = other.id
+    with django_capture_on_commit_callbacks(execute=True):
+        other.delete()
+    content = client.get(url, {"since": new_version}).content.decode()
+    assert f'<tr id="project-row-{other_id}" hx-swap-oob="delete">' in content
+    assert f'id="project-row-{project.id}"' not in content
+
+    # a change to the framework may affect every row
+    with django_capture_on_commit_callbacks(execute=True):
+        objective.name = "renamed"
+        objective.save()
+    response = client.get(url, {"since": new_version})
+    assert response["HX-Refresh"] == "true"
+
+    assert client.get(url, {"since": "latest"}).status_code == 400
+
+
+@override_settings(FORCE_LOGIN=False)
+@pytest.mark.django_db
+def test_status_changes_returns_the_fragments_of_a_project_page(
+    client, django_capture_on_commit_callbacks, project, objective, level, condition
+):
+    # the changes made by the fixtures are recorded along with this one
+    with django_capture_on_commit_callbacks(execute=True):
+        project.save()
+    url = reverse("projects:status_changes")
+    response = client.get(reverse("projects:project", args=[project.id]))
+    version, _ = current_versions()
+    assert f"{url}?since={version}&amp;project={project.id}" in response.content.decode()
+
+    poc = ProjectObjectiveCondition.objects.get(project=project, condition=condition)
+    with django_capture_on_commit_callbacks(execute=True):
+        poc.status = "DO"
+        poc.save()
+    response = client.get(url, {"since": version, "project": project.id})
+
+    content = response.content.decode()
+    projectobjective = ProjectObjective.objects.get(project=project)
+    assert f'id="projectobjective_status_{projectobjective.id}"' in content
+    assert f'id="condition_{poc.id}"' in content
+    assert 'id="commitment-table"' in content
+    assert 'id="changes-poller"' in content
+
+
+def streamed(response):
+    return b"".join(response.streaming_content).decode()
+
+
+@pytest.mark.django_db
+@override_settings(FORCE_LOGIN=False)
+def test_export_streams_the_objective_statuses_as_csv(
+    client, project, project_objective_condition
+):
+    project_objective_condition.status = "DO"
+    project_objective_condition.save()
+    url = reverse("projects:export", args=["statuses", "csv"])
+
+    response = client.get(url)
+
+    assert response.status_code == 200
+    assert response.streaming
+    assert response["Content-Type"] == "text/csv"
+    assert streamed(response).splitlines() == [
+        "id,project,group,objective",
+        f"{project.id},project,,level",
+    ]
+
+
+@pytest.mark.django_db
+@override_settings(FORCE_LOGIN=False)
+def test_export_reads_the_rows_in_one_query(client, objective, work_cycle):
+    url = reverse("projects:export", args=["quality_indicators", "ndjson"])
+    Project.objects.create(name="project_1")
+    with CaptureQueriesContext(connection) as few:
+        streamed(client.get(url))
+
+    for i in range(2, 6):
+        Project.objects.create(name=f"project_{i}")
+    with CaptureQueriesContext(connection) as many:
+        lines = streamed(client.get(url)).splitlines()
+
+    assert len(many) == len(few)
+    assert json.loads(lines[0]) == {
+        "id": Project.objects.get(name="project_1").id,
+        "project": "project_1",
+        "group": None,
+        "current": 0,
+        "wc": 0,
+    }
+    assert len(lines) == 5
+
+
+@pytest.mark.django_db
+@override_settings(FORCE_LOGIN=False)
+def test_export_streams_the_commitments_as_ndjson(client, commitment):
+    commitment.committed = True
+    commitment.save()
+    url = reverse("projects:export", args=["commitments", "ndjson"])
+
+    response = client.get(url)
+
+    assert response["Content-Type"] == "application/x-ndjson"
+    assert [json.loads(line) for line in streamed(response).splitlines()] == [
+        {
+            "project_id": commitment.project_id,
+            "project": "project",
+            "objective": "objective",
+            "level": "level",
+            "cycle": "wc",
+            "met": False,
+        }
+    ]
+
+
+@pytest.mark.django_db
+@override_settings(FORCE_LOGIN=False)
+def test_export_rejects_an_unknown_export(client):
+    assert client.get(reverse("projects:export", args=["users", "csv"])).status_code == 404
+    assert client.get(reverse("projects:export", args=["statuses", "xml"])).status_code == 404
+
+
+@pytest.mark.django_db
+@override_settings(FORCE_LOGIN=False)
+def test_export_is_streamed_asynchronously_under_asgi(project):
+    Project.objects.create(name="other")
+
+    async def download():
+        response = await AsyncClient().get(
+            reverse("projects:export", args=["statuses", "csv"])
+        )
+        # otherwise Django would read the whole export before sending any of it
+        assert response.is_async
+        return b"".join([batch async for batch in response.streaming_content])
+
+    assert async_to_sync(download)().decode().splitlines() == [
+        "id,project,group,objective",
+        f"{Project.objects.get(name='other').id},other,,",
+        f"{project.id},project,,",
+    ]
+
+
+@pytest.mark.django_db
+@override_settings(FORCE_LOGIN=False)
+def test_api_matrix_sends_the_project_list_column_wise(
+    client, project, objective, work_cycle, project_objective_condition
+):
+    project_objective_condition.status = "DO"
+    project_objective_condition.save()
+    other = Project.objects.create(name="other")
+
+    response = client.get(reverse("projects:api_matrix"))
+
+    assert response.status_code == 200
+    data = response.json()
+    assert data["projects"]["id"] == [other.id, project.id]
+    project.refresh_from_db()
+    assert data["projects"]["current_qi"] == [0, project.current_qi]
+    assert data["objectives"] == {
+        "id": [objective.id],
+        "name": ["objective"],
+        "group": [1],
+    }
+    assert data["dictionaries"]["objective_group"] == [None, "group"]
+    # a column of status codes for each objective
+    assert data["dictionaries"]["status"] == [None, "level"]
+    assert data["statuses"] == [[0, 1]]
+    assert data["cycles"]["name"] == ["wc"]
+    assert data["quality_history"] == [
+        [0, QI.objects.get(project=project, workcycle=work_cycle).value]
+    ]
+
+
+@pytest.mark.django_db
+@override_settings(FORCE_LOGIN=False)
+def test_api_matrix_is_compressed_and_conditional(client, project, objective):
+    for i in range(20):
+        Project.objects.create(name=f"project_{i}")
+    url = reverse("projects:api_matrix")
+
+    response = client.get(url, headers={"accept-encoding": "gzip"})
+
+    assert response["Content-Encoding"] == "gzip"
+    assert "Accept-Encoding" in response["Vary"]
+    etag = response["ETag"]
+    response = client.get(
+        url, headers={"accept-encoding": "gzip", "if-none-match": etag}
+    )
+    assert response.status_code == 304
+
+    Project.objects.create(name="new")
+    response = client.get(
+        url, headers={"accept-encoding": "gzip", "if-none-match": etag}
+    )
+    assert response.status_code == 200
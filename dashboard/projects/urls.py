@@ -6,10 +6,15 @@ from .views import (
     action_toggle_commitment,
     action_toggle_condition,
     action_select_reason,
+    action_apply_changes,
     project_basic_form_save,
     status_projects_commitment,
     status_projectobjective,
     status_dashboardprojectobjective,
+    live_updates,
+    status_changes,
+    export_table,
+    api_matrix,
     admin_recalculate_all_levels,
 )
 
@@ -25,7 +30,7 @@ urlpatterns = [
     ),
     # action views
     path(
-        "action_toggle_commitment/<int:commitment_id>",
+        "action_toggle_commitment/<int:project_id>/<int:objective_id>/<int:level_id>/<int:work_cycle_id>",
         action_toggle_commitment,
         name="action_toggle_commitment",
     ),
@@ -39,6 +44,11 @@ urlpatterns = [
         action_select_reason,
         name="action_select_reason",
     ),
+    path(
+        "action_apply_changes/<int:project_id>",
+        action_apply_changes,
+        name="action_apply_changes",
+    ),
     # status views
     path(
         "status_projects_commitment/<int:project_id>",
@@ -55,6 +65,12 @@ urlpatterns = [
         status_dashboardprojectobjective,
         name="status_dashboardprojectobjective",
     ),
+    path("live_updates", live_updates, name="live_updates"),
+    path("status_changes", status_changes, name="status_changes"),
+    # exports
+    path("export/<str:export>.<str:format>", export_table, name="export"),
+    # API
+    path("api/matrix", api_matrix, name="api_matrix"),
     # admin
     path(
         "admin_recalculate_all_levels",
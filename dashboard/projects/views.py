@@ -1,16 +1,35 @@
 import json
-from django.db.models import F, Sum
-from django.shortcuts import render, HttpResponse, HttpResponseRedirect
+import time
+
+from asgiref.sync import sync_to_async
+
+from django.shortcuts import (
+    get_object_or_404,
+    render,
+    HttpResponse,
+    HttpResponseRedirect,
+)
 from django.views.generic import ListView
+from django.views.decorators.gzip import gzip_page
 from django.views.decorators.http import require_http_methods
-from django.forms import inlineformset_factory
-from django.http import QueryDict
+from django.core.handlers.asgi import ASGIRequest
+from django.http import (
+    Http404,
+    HttpResponseBadRequest,
+    QueryDict,
+    StreamingHttpResponse,
+)
 from django.contrib.admin.views.decorators import staff_member_required
 from django.contrib.auth.decorators import permission_required
 from django.contrib import messages
+from django.core.exceptions import ObjectDoesNotExist, PermissionDenied
+from django.core.cache import cache
+from django.template.loader import render_to_string
 from django.urls import reverse
+from django.utils.http import urlencode
 from django.utils import timezone
-from django.utils.text import slugify
+from django.utils.decorators import method_decorator
+from django.utils.safestring import mark_safe
 
 from dashboard.auth_decorators import ConditionalLoginRequiredMixin, conditional_login_required
 
@@ -19,63 +38,111 @@ from .models import (
     Commitment,
     ProjectObjectiveCondition,
     ProjectObjective,
+    ProjectSummary,
 )
 from . import forms
+from .changes import changed_since, current_versions
+from .caching import (
+    DATA_VERSION_KEY,
+    PAGE_TIMEOUT,
+    conditional,
+    page_key,
+    project_keys,
+    projectobjective_keys,
+    row_keys,
+)
+from .batch import apply_changes
+from .commitments import toggle_commitment
+from .columnar import matrix
+from .export import EXPORTS, FORMATS, async_batches, batches, export_lines
+from .detail import (
+    ProjectDetail,
+    current_work_cycle_name,
+    load_current_commitments,
+)
+from .levels import recalculate_all_levels
+from .live import event, get_broker, stream
+from .summary import refresh_summaries
+
+from framework.models import WorkCycle, Objective, Reason
+
+
+def render_rows(projects):
+    """Set ``row`` on each of ``projects`` to its row of the project list, and return the cycles
+    up to today, which the rows show the QIs of."""
+
+    # projects created without save() (for example, by a fixture) have no summary yet
+    missing = [project.id for project in projects if not hasattr(project, "summary")]
+    if missing:
+        refresh_summaries(missing)
+        summaries = ProjectSummary.objects.in_bulk(missing)
+        for project in projects:
+            if project.id in summaries:
+                project.summary = summaries[project.id]
+
+    workcycle_list = list(WorkCycle.objects.filter(timestamp__lte=timezone.now().date()))
+    past_workcycle_ids = {workcycle.id for workcycle in workcycle_list}
+
+    # only the rows of projects that have changed since they were cached are rendered
+    keys = row_keys(project.id for project in projects)
+    rows = cache.get_many(keys.values())
+    rendered = {}
+    for project in projects:
+        key = keys[project.id]
+        if key not in rows:
+            project.quality_history_values = [
+                value
+                for workcycle_id, value in project.summary.quality_history
+                if workcycle_id in past_workcycle_ids
+            ]
+            rows[key] = rendered[key] = render_to_string(
+                "projects/partial_project_list_row.html", {"project": project}
+            )
+        project.row = mark_safe(rows[key])
+    cache.set_many(rendered, PAGE_TIMEOUT)
+    return workcycle_list
+
 
-from framework.models import WorkCycle, Objective, ObjectiveGroup, Reason
+def changes_url(version, project_id=None, name="projects:status_changes"):
+    """The URL a page rendered at change ``version`` asks for what has changed since, or with
+    ``name`` "projects:live_updates", listens to for the changes as they're made."""
+    params = {"since": version}
+    if project_id is not None:
+        params["project"] = project_id
+    return f"{reverse(name)}?{urlencode(params)}"
 
 
 class ProjectListView(ConditionalLoginRequiredMixin, ListView):
     model = Project
 
+    @method_decorator(conditional(lambda: [DATA_VERSION_KEY]))
+    def get(self, request, *args, **kwargs):
+        # the page is the same for everyone with the same permissions, until the data changes
+        key = page_key("project_list", request.user)
+        content = cache.get(key)
+        if content is not None:
+            return HttpResponse(content)
+        response = super().get(request, *args, **kwargs)
+        response.render()
+        cache.set(key, response.content, PAGE_TIMEOUT)
+        return response
+
     def get_queryset(self):
+        # each row comes from the project and its summary, in a single query
         return super().get_queryset().select_related(
-            "group", "agreement_status", "last_review_status"
-        ).prefetch_related("qi_set__workcycle")
+            "group", "agreement_status", "last_review_status", "summary"
+        )
 
     def get_context_data(self, **kwargs):
 
+        # read first, so that whatever changes while the page is rendered is caught up with
+        version, _ = current_versions()
         context = super().get_context_data(**kwargs)
 
-
-        # Build a per-project objective map once to avoid repeated row-level lookups.
-        pos_by_project = {}
-        for po in ProjectObjective.objects.all().values(
-            "project_id",
-            "objective__name",
-            "id",
-            "level_achieved__name",
-            "unstarted_reason__name",
-        ):
-            pos_by_project.setdefault(po["project_id"], []).append(po)
-
         projects = list(context["object_list"])
-        project_ids = [project.id for project in projects]
+        workcycle_list = render_rows(projects)
 
-        # Collect quality indicator totals in one grouped query.
-        quality_indicator_by_project = {
-            row["project_id"]: row["total"]
-            for row in ProjectObjective.objects.filter(
-                project_id__in=project_ids, level_achieved__isnull=False
-            )
-            .values("project_id")
-            .annotate(total=Sum(F("level_achieved__value") * F("objective__weight")))
-        }
-
-        today = timezone.now().date()
-
-        # Attach prepared values to each project so the template can render without extra ORM work.
-        for project in projects:
-            project.projectobjectives = pos_by_project.get(project.id, [])
-            project.quality_history_values = [
-                qi for qi in project.qi_set.all() if qi.workcycle.timestamp <= today
-            ]
-            project.quality_indicator_value = quality_indicator_by_project.get(
-                project.id, 0
-            )
-
-        workcycle_list = list(WorkCycle.objects.filter(timestamp__lte=timezone.now().date()))
-        objective_list = list(Objective.objects.all())
+        objective_list = list(Objective.objects.select_related("group"))
         workcycle_count = len(workcycle_list)
         objective_count = len(objective_list)
 
@@ -85,52 +152,41 @@ class ProjectListView(ConditionalLoginRequiredMixin, ListView):
         context["objective_count"] = objective_count
         context["column_count"] = objective_count + workcycle_count + 7
         context["quality_cols_count"] = 4 + workcycle_count
+        context["changes_url"] = changes_url(version)
+        context["live_url"] = changes_url(version, name="projects:live_updates")
 
         return context
 
 
 @conditional_login_required
+@conditional(lambda id: project_keys(id))
 def project(request, id):
 
-    project = Project.objects.get(id=id)
+    # read first, so that whatever changes while the page is rendered is caught up with
+    version, _ = current_versions()
+    # everything on the page, loaded in a fixed number of queries
+    detail = ProjectDetail.load(id)
+    project = detail.project
 
     basics_form = forms.ProjectDetailForm(instance=project)
     if not request.user.has_perm('projects.change_project'):
         for fieldname in basics_form.fields:
             basics_form.fields[fieldname].disabled = True
 
-    commitments = Commitment.objects.filter(project=project)
-
-
-    ProjectObjectiveInlineFormSet = inlineformset_factory(
-        Project,
-        ProjectObjective,
-        form=forms.ProjectObjectiveForm,
-        edit_only=True,
-        can_delete=False,
-        extra=0,
-    )
-
     return render(
         request,
         "projects/project.html",
         {
             "project": project,
-            "work_cycles": WorkCycle.objects.all(),
-            "current_work_cycle_name": WorkCycle.name_of_current(),
-            "workcycle_count": WorkCycle.objects.count(),
-            "objectivegroup_list": ObjectiveGroup.objects.all(),
-            "objective_list": Objective.objects.all(),
-            "objective_count": Objective.objects.count(),
-            "commitments": commitments,
-            "current_commitments": commitments.filter(
-                work_cycle__is_current=True, committed=True
-            ),
-            "unstarted_reasons": Reason.objects.all(),
+            "objective_groups": detail.groups,
+            "work_cycles": detail.work_cycles,
+            "current_work_cycle_name": detail.current_work_cycle_name,
+            "workcycle_count": len(detail.work_cycles),
+            "current_commitments": detail.current_commitments,
+            "unstarted_reasons": detail.unstarted_reasons,
             "basics_form": basics_form,
-            "projectobjectives_formset": ProjectObjectiveInlineFormSet(
-                instance=project
-            ),
+            "changes_url": changes_url(version, project.id),
+            "live_url": changes_url(version, project.id, "projects:live_updates"),
         },
     )
 
@@ -138,12 +194,11 @@ def project(request, id):
 # detail view status methods
 
 @require_http_methods(["GET"])
+@conditional(project_keys)
 def status_projects_commitment(request, project_id):
 
     project = Project.objects.get(id=project_id)
-    current_commitments = Commitment.objects.filter(
-        project=project, work_cycle__is_current=True, committed=True
-    )
+    current_commitments = load_current_commitments(project_id)
 
     return render(
         request,
@@ -156,6 +211,7 @@ def status_projects_commitment(request, project_id):
     )
 
 @require_http_methods("GET")
+@conditional(projectobjective_keys)
 def status_projectobjective(request, projectobjective_id):
 
     projectobjective = ProjectObjective.objects.get(id=projectobjective_id)
@@ -172,6 +228,7 @@ def status_projectobjective(request, projectobjective_id):
 # list view status methods
 
 @require_http_methods("GET")
+@conditional(projectobjective_keys)
 def status_dashboardprojectobjective(request, projectobjective_id):
     projectobjective = ProjectObjective.objects.get(id=projectobjective_id)
 
@@ -184,20 +241,181 @@ def status_dashboardprojectobjective(request, projectobjective_id):
     )
 
 
+def parse_changes_request(request):
+    """Return the version and the project, if any, a page asks for the changes since, or raise
+    ValueError."""
+    try:
+        since = int(request.GET["since"])
+        project_id = int(request.GET["project"]) if "project" in request.GET else None
+    except KeyError:
+        raise ValueError("Malformed version.")
+    return since, project_id
+
+
+def render_changes(request, since, project_id=None):
+    """Return what has changed since the version a page was rendered at, for pages kept open
+    all day: the list's rows or, with a project, the fragments of its page, as out-of-band
+    swaps. The poller that asks again comes last, carrying the new version.
+
+    Returns the version the page is at once the response is swapped in, and the response.
+    """
+    version, framework_version = current_versions()
+    if since < framework_version or since > version:
+        # something that every project depends on has changed, or the version is from
+        # another database, so the whole page is reloaded
+        response = HttpResponse("")
+        response["HX-Refresh"] = "true"
+        return since, response
+
+    changed = changed_since(since, None if project_id is None else [project_id])
+    if not changed:
+        # leaves the page as it is
+        return since, HttpResponse(status=204)
+
+    context = {"changes_url": changes_url(version, project_id)}
+    if project_id is None:
+        projects = list(
+            Project.objects.filter(id__in=changed).select_related(
+                "group", "agreement_status", "last_review_status", "summary"
+            )
+        )
+        render_rows(projects)
+        context["projects"] = projects
+        context["deleted_project_ids"] = set(changed) - {
+            project.id for project in projects
+        }
+        return version, render(
+            request, "projects/partial_project_list_changed_since.html", context
+        )
+
+    try:
+        detail = ProjectDetail.load(project_id)
+    except Project.DoesNotExist:
+        response = HttpResponse("")
+        response["HX-Refresh"] = "true"
+        return since, response
+    context |= {
+        "project": detail.project,
+        "objective_groups": detail.groups,
+        "current_work_cycle_name": detail.current_work_cycle_name,
+        "workcycle_count": len(detail.work_cycles),
+        "current_commitments": detail.current_commitments,
+        "unstarted_reasons": detail.unstarted_reasons,
+    }
+    return version, render(
+        request, "projects/partial_project_detail_changed_since.html", context
+    )
+
+
+@conditional_login_required
+@require_http_methods(["GET"])
+async def live_updates(request):
+    # The changes a page needs, as they are made, as server-sent events: each event carries the
+    # fragments status_changes would return, rendered for the page's user, so that the page
+    # doesn't have to ask for them. The response never ends, which only an ASGI server can
+    # serve, as the deployed site is: a WSGI server would wait for it to end.
+    if not isinstance(request, ASGIRequest):
+        # tells the browser not to reconnect, and the page keeps polling
+        return HttpResponse(status=204)
+    try:
+        since, project_id = parse_changes_request(request)
+    except ValueError:
+        return HttpResponseBadRequest("Malformed version.")
+
+    async def changes(project_ids):
+        nonlocal since
+        # None stands for every project
+        if project_id is not None and not {project_id, None} & set(project_ids):
+            return None
+        since, response = await sync_to_async(render_changes)(
+            request, since, project_id
+        )
+        if response.status_code == 204:
+            return None
+        if response.has_header("HX-Refresh"):
+            return event("refresh")
+        return event("changes", response.content.decode())
+
+    response = StreamingHttpResponse(
+        stream(get_broker(), changes), content_type="text/event-stream"
+    )
+    response["Cache-Control"] = "no-cache"
+    # stops proxies such as nginx from holding the events back
+    response["X-Accel-Buffering"] = "no"
+    return response
+
+
+@conditional_login_required
+@require_http_methods(["GET"])
+def status_changes(request):
+    # What has changed since the version a page was rendered at, for the pages that aren't
+    # sent it as it happens; see render_changes()
+    try:
+        since, project_id = parse_changes_request(request)
+    except ValueError:
+        return HttpResponseBadRequest("Malformed version.")
+    return render_changes(request, since, project_id)[1]
+
+
+@conditional_login_required
+@require_http_methods(["GET"])
+def export_table(request, export, format):
+    # A table of the project data for reporting, as CSV or NDJSON, streamed as it is read from
+    # the database.
+    if export not in EXPORTS or format not in FORMATS:
+        raise Http404("No such export.")
+
+    lines = export_lines(export, format)
+    response = StreamingHttpResponse(
+        async_batches(lines) if isinstance(request, ASGIRequest) else batches(lines),
+        content_type=FORMATS[format],
+    )
+    response["Content-Disposition"] = f'attachment; filename="{export}.{format}"'
+    return response
+
+
+@conditional_login_required
+@require_http_methods(["GET"])
+@gzip_page
+@conditional(lambda: [DATA_VERSION_KEY])
+def api_matrix(request):
+    # The data of the project list, column-wise, for clients that render it themselves. Like
+    # the list, it is cached until the data changes.
+    key = page_key("api_matrix", request.user)
+    content = cache.get(key)
+    if content is None:
+        content = json.dumps(matrix(), separators=(",", ":"))
+        cache.set(key, content, PAGE_TIMEOUT)
+    return HttpResponse(content, content_type="application/json")
+
+
 # action methods
 
 @permission_required("projects.change_commitment")
 @require_http_methods(["PUT"])
-def action_toggle_commitment(request, commitment_id):
-    commitment = Commitment.objects.get(id=commitment_id)
-    commitment.committed = not commitment.committed
-    commitment.save()
-
+def action_toggle_commitment(request, project_id, objective_id, level_id, work_cycle_id):
+    committed = toggle_commitment(project_id, objective_id, level_id, work_cycle_id)
+    if committed is None:
+        raise Http404("No such commitment.")
+
+    # The response replaces the commitment's cell, so the checkbox shows the state the toggle
+    # left behind, even if someone else toggled it at the same time.
+    commitment = Commitment(
+        project_id=project_id,
+        objective_id=objective_id,
+        level_id=level_id,
+        work_cycle_id=work_cycle_id,
+        committed=committed,
+    )
+    response = render(
+        request,
+        "projects/partial_project_detail_commitment.html",
+        {"commitment": commitment},
+    )
     # Include a custom event in the HTTP header.
     # On the project detail page, the commitments table will trigger a refresh when the page sees
     # the event.
     # See https://htmx.org/headers/hx-trigger/
-    response = HttpResponse("")
     response["HX-Trigger-After-Swap"] = "updateCommitment"
     return response
 
@@ -205,7 +423,9 @@ def action_toggle_commitment(request, commitment_id):
 @permission_required("projects.change_projectobjectivecondition")
 @require_http_methods(["PUT"])
 def action_toggle_condition(request, condition_id):
-    condition = ProjectObjectiveCondition.objects.get(id=condition_id)
+    condition = ProjectObjectiveCondition.objects.select_related("condition").get(
+        id=condition_id
+    )
     target = request.GET["target"]
     status = request.GET["status"]
 
@@ -228,20 +448,27 @@ def action_toggle_condition(request, condition_id):
 
     condition.save()
 
-    response = render(
+    # The level achieved may have changed, so the objective's status and the commitments table
+    # go back along with the condition's row, all swapped in by their ids as out-of-band swaps:
+    # one request updates all three.
+    # See https://htmx.org/attributes/hx-swap-oob/
+    projectobjective = ProjectObjective.objects.select_related(
+        "project", "objective", "level_achieved", "unstarted_reason"
+    ).get(project=condition.project_id, objective=condition.objective_id)
+    work_cycles = list(WorkCycle.objects.all())
+    return render(
         request,
-        "projects/partial_project_detail_condition.html",
-        {"condition": condition, "workcycle_count": WorkCycle.objects.count()},
+        "projects/partial_project_detail_condition_toggled.html",
+        {
+            "condition": condition,
+            "workcycle_count": len(work_cycles),
+            "projectobjective": projectobjective,
+            "unstarted_reasons": Reason.objects.all(),
+            "project": projectobjective.project,
+            "current_work_cycle_name": current_work_cycle_name(work_cycles),
+            "current_commitments": load_current_commitments(condition.project_id),
+        },
     )
-    # Include a custom event in the HTTP header.
-    # On the project detail page, the commitments table and the PO status will trigger a refresh
-    # when the page sees the event. We want to be able to target a specific PO status, so we
-    # attach a value (the PO name) to the event.
-    # See https://htmx.org/headers/hx-trigger/
-    response["HX-Trigger-After-Swap"] = json.dumps({
-        "updateCondition": slugify(condition.projectobjective().name()),
-    })
-    return response
 
 
 @permission_required("projects.change_projectobjective")
@@ -259,6 +486,77 @@ def action_select_reason(request, projectobjective_id):
     return HttpResponse("")
 
 
+@permission_required("projects.change_projectobjectivecondition")
+@require_http_methods(["POST"])
+def action_apply_changes(request, project_id):
+    """Apply a batch of changes to a project in one go, and return every fragment of its page
+    that changed, as out-of-band swaps. The changes are sent as JSON:
+
+        {
+            "conditions": [{"id": 1, "status": "DO"}, ...],
+            "commitments": [{"objective": 1, "level": 2, "work_cycle": 3}, ...],
+            "reasons": [{"projectobjective": 1, "reason": 4}, ...]
+        }
+
+    Conditions are given their status, commitments are toggled, and a reason of null clears it.
+    """
+    project = get_object_or_404(Project, id=project_id)
+    try:
+        body = json.loads(request.body)
+        conditions = {
+            int(change["id"]): change["status"] for change in body.get("conditions", [])
+        }
+        commitments = [
+            (int(change["objective"]), int(change["level"]), int(change["work_cycle"]))
+            for change in body.get("commitments", [])
+        ]
+        reasons = {
+            int(change["projectobjective"]): (
+                None if change.get("reason") is None else int(change["reason"])
+            )
+            for change in body.get("reasons", [])
+        }
+    except (AttributeError, KeyError, TypeError, ValueError):
+        return HttpResponseBadRequest("Malformed changes.")
+
+    # the same permissions as the views that make each kind of change on its own
+    permissions = [
+        permission
+        for permission, requested in [
+            ("projects.change_projectobjectivecondition", conditions),
+            ("projects.change_commitment", commitments),
+            ("projects.change_projectobjective", reasons),
+        ]
+        if requested
+    ]
+    if not request.user.has_perms(permissions):
+        raise PermissionDenied
+
+    try:
+        changes = apply_changes(project_id, conditions, commitments, reasons)
+    except ValueError as error:
+        return HttpResponseBadRequest(str(error))
+    except ObjectDoesNotExist as error:
+        raise Http404(str(error))
+
+    work_cycles = list(WorkCycle.objects.all())
+    return render(
+        request,
+        "projects/partial_project_detail_changes.html",
+        {
+            "changes": changes,
+            "workcycle_count": len(work_cycles),
+            "projectobjectives": ProjectObjective.objects.filter(
+                project=project, objective__in=changes.objective_ids
+            ).select_related("objective", "level_achieved", "unstarted_reason"),
+            "unstarted_reasons": Reason.objects.all(),
+            "project": project,
+            "current_work_cycle_name": current_work_cycle_name(work_cycles),
+            "current_commitments": load_current_commitments(project_id),
+        },
+    )
+
+
 # form methods
 
 @permission_required("projects.change_project")
@@ -279,10 +577,14 @@ def project_basic_form_save(request, project_id):
 @staff_member_required
 @require_http_methods(["GET"])
 def admin_recalculate_all_levels(request):
-    for projectobjective in ProjectObjective.objects.all():
-        projectobjective.save()
+    start = time.monotonic()
+    updated = recalculate_all_levels()
+    elapsed = time.monotonic() - start
 
-    messages.info(request, 'Recalculated all levels.')
+    messages.info(
+        request,
+        f"Recalculated all levels: {updated} objective statuses changed in {elapsed:.2f}s.",
+    )
     return HttpResponseRedirect(
        reverse('admin:index')
     )
@@ -0,0 +1,17 @@
+// Listens for the changes of the page, pushed by the server as server-sent events, and swaps them
+// in straight away rather than at the poller's next minute. The fragments come with a poller
+// carrying the new version, so the poller doesn't fetch them again. Without an ASGI server the
+// events aren't sent, and the poller keeps asking every minute.
+(function () {
+  const source = new EventSource(document.currentScript.dataset.url);
+
+  source.addEventListener("changes", function (event) {
+    // the fragments are all out-of-band swaps
+    htmx.swap(document.body, event.data, { swapStyle: "none" });
+  });
+
+  source.addEventListener("refresh", function () {
+    source.close();
+    window.location.reload();
+  });
+})();
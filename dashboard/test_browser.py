@@ -30,6 +30,30 @@ class BrowserTestData:
     commitment_colour_first_results_2026: Commitment
 
 
+def make_commitment(project, objective, level, work_cycle, committed):
+    # only commitments that have been made are stored
+    commitment = Commitment(
+        project=project,
+        objective=objective,
+        level=level,
+        work_cycle=work_cycle,
+        committed=committed,
+    )
+    if committed:
+        commitment.save()
+    return commitment
+
+
+def is_committed(commitment):
+    return Commitment.objects.filter(
+        project=commitment.project,
+        objective=commitment.objective,
+        level=commitment.level,
+        work_cycle=commitment.work_cycle,
+        committed=True,
+    ).exists()
+
+
 @pytest.fixture
 def browser_test_data(transactional_db):
     # Create the smallest object graph needed by the browser tests.
@@ -171,58 +195,22 @@ def browser_test_data(transactional_db):
     ):
         poc.save(update_fields=["status"])
 
-    commitment_agree_started_2022 = Commitment.objects.get(
-        project=project,
-        objective=objective_agreeableness,
-        level=level_started,
-        work_cycle=workcycle_2022,
+    commitment_agree_started_2022 = make_commitment(
+        project, objective_agreeableness, level_started, workcycle_2022, False
     )
-    commitment_agree_started_2025 = Commitment.objects.get(
-        project=project,
-        objective=objective_agreeableness,
-        level=level_started,
-        work_cycle=workcycle_2025,
+    commitment_agree_started_2025 = make_commitment(
+        project, objective_agreeableness, level_started, workcycle_2025, True
     )
-    commitment_agree_started_2026 = Commitment.objects.get(
-        project=project,
-        objective=objective_agreeableness,
-        level=level_started,
-        work_cycle=workcycle_2026,
+    make_commitment(
+        project, objective_agreeableness, level_started, workcycle_2026, True
     )
-    commitment_colour_started_2026 = Commitment.objects.get(
-        project=project,
-        objective=objective_colourfulness,
-        level=level_started,
-        work_cycle=workcycle_2026,
+    make_commitment(
+        project, objective_colourfulness, level_started, workcycle_2026, True
     )
-    commitment_colour_first_results_2026 = Commitment.objects.get(
-        project=project,
-        objective=objective_colourfulness,
-        level=level_first_results,
-        work_cycle=workcycle_2026,
+    commitment_colour_first_results_2026 = make_commitment(
+        project, objective_colourfulness, level_first_results, workcycle_2026, False
     )
-    commitment_handling_started_2026 = Commitment.objects.get(
-        project=project,
-        objective=objective_handling,
-        level=level_started,
-        work_cycle=workcycle_2026,
-    )
-
-    commitment_agree_started_2022.committed = False
-    commitment_agree_started_2025.committed = True
-    commitment_agree_started_2026.committed = True
-    commitment_colour_started_2026.committed = True
-    commitment_colour_first_results_2026.committed = False
-    commitment_handling_started_2026.committed = True
-    for commitment in (
-        commitment_agree_started_2022,
-        commitment_agree_started_2025,
-        commitment_agree_started_2026,
-        commitment_colour_started_2026,
-        commitment_colour_first_results_2026,
-        commitment_handling_started_2026,
-    ):
-        commitment.save(update_fields=["committed"])
+    make_commitment(project, objective_handling, level_started, workcycle_2026, True)
 
     colourfulness_projectobjective = poc_has_red.projectobjective()
 
@@ -294,18 +282,9 @@ def test_toggling_conditions(
         ProjectObjectiveCondition.objects.get(pk=condition.pk).status == initial_status
     )
 
-    projectobjective = condition.projectobjective()
-
     toggle = page.get_by_test_id(f"toggle_condition_{condition.id}")
     expect(toggle).to_be_visible()
-    with (
-        page.expect_response(
-            f"**/action_toggle_condition/{condition.id}?status={initial_status}&target=done"
-        ),
-        page.expect_response(f"**/status_projectobjective/{projectobjective.id}"),
-        page.expect_response(f"**/status_projects_commitment/{project.id}"),
-    ):
-        getattr(toggle, toggle_action)()
+    toggle_condition(page, condition.id, toggle_action)
 
     condition.refresh_from_db()
     assert condition.status == target_status
@@ -347,26 +326,31 @@ def test_toggling_commitments(
     page.goto(project_url(live_server, project))
 
     commitment = getattr(browser_test_data, commitment_key)
-    assert Commitment.objects.get(pk=commitment.pk).committed == initial_committed
+    assert is_committed(commitment) == initial_committed
 
-    toggle = page.get_by_test_id(f"toggle_commitment_{commitment.id}")
+    toggle = page.get_by_test_id(f"toggle_commitment_{commitment.slug()}")
     expect(toggle).to_be_visible()
     with (
-        page.expect_response(f"**/action_toggle_commitment/{commitment.id}"),
+        page.expect_response(
+            f"**/action_toggle_commitment/{commitment.project_id}/{commitment.objective_id}"
+            f"/{commitment.level_id}/{commitment.work_cycle_id}"
+        ),
         page.expect_response(f"**/status_projects_commitment/{project.id}"),
     ):
         getattr(toggle, toggle_action)()
 
-    commitment.refresh_from_db()
-    assert commitment.committed == target_committed
+    assert is_committed(commitment) == target_committed
 
 
-def check_condition_for_status(page, projectobjective_id, condition_id, project_id):
-    with (
-        page.expect_response(f"**/status_projectobjective/{projectobjective_id}"),
-        page.expect_response(f"**/status_projects_commitment/{project_id}"),
-    ):
-        page.get_by_test_id(f"toggle_condition_{condition_id}").check()
+def toggle_condition(page, condition_id, toggle_action="check"):
+    # The response carries the condition's row, the objective status and the commitments
+    # table, which htmx swaps in by their ids all at once. Once the old row is gone, the whole
+    # response has been swapped in.
+    toggle = page.get_by_test_id(f"toggle_condition_{condition_id}")
+    row = toggle.locator("xpath=ancestor::tr[1]").element_handle()
+    with page.expect_response(f"**/action_toggle_condition/{condition_id}?*"):
+        getattr(toggle, toggle_action)()
+    row.wait_for_element_state("hidden")
 
 
 @pytest.mark.parametrize(
@@ -408,12 +392,7 @@ def test_status(
     ).to_have_text("")
 
     for condition_key in condition_keys:
-        check_condition_for_status(
-            page,
-            projectobjective.id,
-            getattr(browser_test_data, condition_key).id,
-            project.id,
-        )
+        toggle_condition(page, getattr(browser_test_data, condition_key).id)
 
     final_condition = getattr(browser_test_data, condition_keys[-1])
     assert final_condition.projectobjective().status == getattr(
@@ -451,18 +430,12 @@ def assert_commitment_table_rows(page, expected_rows):
 def apply_commitment_table_operation(page, project_id, browser_test_data, operation):
     operation_type, data_key = operation
     obj = getattr(browser_test_data, data_key)
-    toggle_kind = "condition" if operation_type == "condition" else "commitment"
 
     if operation_type == "condition":
-        projectobjective_id = obj.projectobjective().id
-        with (
-            page.expect_response(f"**/status_projects_commitment/{project_id}"),
-            page.expect_response(f"**/status_projectobjective/{projectobjective_id}"),
-        ):
-            page.get_by_test_id(f"toggle_{toggle_kind}_{obj.id}").check()
+        toggle_condition(page, obj.id)
     else:
         with page.expect_response(f"**/status_projects_commitment/{project_id}"):
-            page.get_by_test_id(f"toggle_{toggle_kind}_{obj.id}").check()
+            page.get_by_test_id(f"toggle_commitment_{obj.slug()}").check()
 
 
 @pytest.mark.parametrize(
@@ -198,6 +198,31 @@ DATABASES = {
 }
 
 
+# Cache
+# https://docs.djangoproject.com/en/4.2/topics/cache/
+
+# The cached pages are invalidated through the cache, which must therefore be shared by all
+# the workers: use Redis when it's integrated, and otherwise don't cache.
+if os.environ.get("REDIS_DB_CONNECT_STRING"):
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.redis.RedisCache",
+            "LOCATION": os.environ["REDIS_DB_CONNECT_STRING"],
+        }
+    }
+else:
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.dummy.DummyCache",
+        }
+    }
+
+
+# Live updates of the project list go through Redis when it's configured, so that they reach
+# the pages served by every process; otherwise they only reach those of the same process.
+LIVE_UPDATES_REDIS_URL = os.environ.get("REDIS_DB_CONNECT_STRING")
+
+
 # Password validation
 # https://docs.djangoproject.com/en/4.2/ref/settings/#auth-password-validators
 